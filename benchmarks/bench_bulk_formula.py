@@ -0,0 +1,49 @@
+"""
+Runtime and peak memory of the regular and the fused bulk formula evaluation.
+
+Usage: ``python benchmarks/bench_bulk_formula.py [nt ny nx]``
+"""
+
+import sys
+
+from common import best_of, report, synthetic_product
+
+from windeval.processing import BulkFormula
+
+
+DRAG_COEFFICIENTS = [
+    "ncep_ncar_2007",
+    "large_and_pond_1981",
+    "yelland_and_taylor_1996",
+    "trenberth_etal_1990",
+    "large_and_yeager_2004",
+    "kara_etal_2000",
+]
+
+
+def main(nt: int = 24, ny: int = 360, nx: int = 720) -> None:
+    X = synthetic_product(nt, ny, nx)
+    nbytes = X.eastward_wind.nbytes
+    rows = []
+    for name in DRAG_COEFFICIENTS:
+        t0, m0 = best_of(3, BulkFormula(name).calculate, X, "eastward_wind")
+        t1, m1 = best_of(3, BulkFormula(name, fused=True).calculate, X, "eastward_wind")
+        rows.append(
+            (
+                name,
+                f"{t0 * 1e3:.0f}",
+                f"{t1 * 1e3:.0f}",
+                f"{t0 / t1:.1f}x",
+                f"{m0 / nbytes:.1f}",
+                f"{m1 / nbytes:.1f}",
+            )
+        )
+    print(f"grid {nt}x{ny}x{nx}, peak memory in multiples of one field")
+    report(
+        rows,
+        ("drag_coefficient", "ms", "fused ms", "speedup", "peak", "fused peak"),
+    )
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,44 @@
+"""
+Runtime of compute with a cold and a warm on-disk cache.
+
+Usage: ``python benchmarks/bench_cache.py [nt ny nx]``
+"""
+
+import sys
+import tempfile
+
+from common import report, synthetic_product, wall_time
+
+from windeval import processing
+
+
+TARGETS = [
+    "sverdrup_transport",
+    "northward_ekman_transport",
+    "eastward_ekman_transport",
+]
+
+
+def run(X, cache):
+    return processing.compute(X.copy(), TARGETS, cache=cache)
+
+
+def main(nt: int = 120, ny: int = 180, nx: int = 360) -> None:
+    X = synthetic_product(nt, ny, nx)
+    with tempfile.TemporaryDirectory() as path:
+        cache = processing.Cache(path)
+        variants = {
+            "no cache": (1, None),
+            "cold cache": (1, cache),
+            "warm cache": (3, cache),
+        }
+        rows = [
+            (k, f"{wall_time(n, run, X, c):.2f}") for k, (n, c) in variants.items()
+        ]
+        stats = cache.stats
+    print(f"one product of {nt}x{ny}x{nx}, seconds, cache {stats}")
+    report(rows, ("variant", "s"))
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:]])
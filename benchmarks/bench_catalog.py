@@ -0,0 +1,38 @@
+"""
+Opening and describing a product of many daily files, by opening the files or from
+a catalog indexed once.
+
+Usage: ``python benchmarks/bench_catalog.py [n_files ny nx]``
+"""
+
+import os
+import sys
+import tempfile
+
+from common import report, synthetic_product, wall_time
+
+from windeval.io import catalog, products
+
+
+def main(n_files: int = 365, ny: int = 45, nx: int = 90) -> None:
+    X = synthetic_product(24, ny, nx)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for d in range(n_files):
+            day = X.assign_coords(time=X.time + 24 * d)
+            day.to_netcdf(os.path.join(tmpdir, f"day_{d:04d}.nc"))
+        pattern = os.path.join(tmpdir, "day_*.nc")
+        c = catalog.Catalog(os.path.join(tmpdir, "catalog.sqlite"))
+        rows = [
+            ("index catalog", wall_time(1, c.add, "a", pattern)),
+            ("update catalog, unchanged", wall_time(3, c.update, "a")),
+            ("open files", wall_time(3, products._open, pattern, None, False)),
+            ("open files, parallel", wall_time(3, products._open, pattern, None, True)),
+            ("open from catalog", wall_time(3, c.open, "a")),
+            ("info from catalog", wall_time(3, products.info, "a", catalog=c)),
+        ]
+    print(f"{n_files} files of 24x{ny}x{nx}")
+    report([(k, f"{s * 1e3:.0f}") for k, s in rows], ("variant", "ms"))
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,52 @@
+"""
+Collocation of a product with many stations, one station at a time with
+:meth:`xarray.Dataset.interp` or all at once with shared sparse weights.
+
+Usage: ``python benchmarks/bench_collocation.py [nt ny nx n_stations]``
+"""
+
+import sys
+
+import numpy as np
+
+from common import best_of, report, synthetic_product, wall_time
+
+from windeval import _spatial
+from windeval.collocation import collocate
+
+
+def per_station(X, points):
+    return [
+        X.eastward_wind.interp(latitude=lat, longitude=lon) for lon, lat in points
+    ]
+
+
+def cold(X, points, method):
+    _spatial._cached_weights.cache_clear()
+    return collocate(X[["eastward_wind"]], points, method=method)
+
+
+def main(nt: int = 168, ny: int = 180, nx: int = 360, n: int = 500) -> None:
+    X = synthetic_product(nt, ny, nx)
+    rng = np.random.default_rng(0)
+    points = np.stack([rng.uniform(1, 359, n), rng.uniform(-60, 60, n)], axis=-1)
+    rows = [("per station interp", wall_time(1, per_station, X, points), None)]
+    for method in ["bilinear", "nearest"]:
+        seconds, peak = best_of(3, cold, X, points, method)
+        rows.append((f"{method}, weights built", seconds, peak))
+        seconds, peak = best_of(
+            3, collocate, X[["eastward_wind"]], points, method=method
+        )
+        rows.append((f"{method}, weights cached", seconds, peak))
+    print(f"{n} stations, {nt}x{ny}x{nx}")
+    report(
+        [
+            (k, f"{s * 1e3:.1f}", "" if p is None else f"{p / 2 ** 20:.1f}")
+            for k, s, p in rows
+        ],
+        ("variant", "ms", "peak MiB"),
+    )
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:]])
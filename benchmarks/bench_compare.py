@@ -0,0 +1,55 @@
+"""
+Comparison metrics between three products, computed on aligned full-length copies
+or streamed block by block.
+
+Usage: ``python benchmarks/bench_compare.py [nt ny nx]``
+"""
+
+import sys
+
+import numpy as np
+import xarray as xr
+
+from common import best_of, report, synthetic_product
+
+from windeval import processing
+
+
+def aligned(wnddict, var):
+    names = list(wnddict)
+    das = xr.align(*[wnddict[k][var] for k in names], join="inner")
+    result = {}
+    for i in range(len(das)):
+        for j in range(i + 1, len(das)):
+            a, b = das[i], das[j]
+            valid = a.notnull() & b.notnull()
+            a, b = a.where(valid), b.where(valid)
+            d = a - b
+            result[names[i], names[j]] = xr.Dataset(
+                {
+                    "bias": d.mean("time"),
+                    "rmse": np.sqrt((d ** 2).mean("time")),
+                    "mae": abs(d).mean("time"),
+                    "correlation": xr.corr(a, b, "time"),
+                    "std_ratio": a.std("time") / b.std("time"),
+                }
+            )
+    return result
+
+
+def main(nt: int = 720, ny: int = 180, nx: int = 360) -> None:
+    wnddict = {
+        k: synthetic_product(nt, ny, nx, seed=s).assign_coords(time=np.arange(nt) + s)
+        for s, k in enumerate(["a", "b", "c"])
+    }
+    rows = []
+    for name, func in [("aligned copies", aligned), ("streamed", processing.compare)]:
+        seconds, peak = best_of(1, func, wnddict, "eastward_wind")
+        rows.append((name, f"{seconds:.2f}", f"{peak / 2 ** 20:.0f}"))
+    nbytes = wnddict["a"].eastward_wind.nbytes
+    print(f"3 products of {nt}x{ny}x{nx}, {nbytes / 2 ** 20:.0f} MiB per variable")
+    report(rows, ("variant", "s", "peak MiB"))
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,53 @@
+"""
+Cross-spectra of every pair of four products, by repeated calls of
+:func:`scipy.signal.csd` and :func:`scipy.signal.coherence` or with the segment
+FFTs of each product shared between its pairs.
+
+Usage: ``python benchmarks/bench_cross_spectra.py [nt ny nx]``
+"""
+
+import sys
+
+import numpy as np
+
+from common import best_of, report, synthetic_product
+from scipy import signal
+
+from windeval import processing
+
+
+NPERSEG = 96
+
+
+def repeated(wnddict, var):
+    names = list(wnddict)
+    result = {}
+    for i in range(len(names)):
+        for j in range(i + 1, len(names)):
+            a = np.moveaxis(wnddict[names[i]][var].values, 0, -1)
+            b = np.moveaxis(wnddict[names[j]][var].values, 0, -1)
+            f, csd = signal.csd(a, b, nperseg=NPERSEG)
+            _, coherence = signal.coherence(a, b, nperseg=NPERSEG)
+            result[names[i], names[j]] = (csd, coherence, np.angle(csd))
+    return result
+
+
+def shared(wnddict, var):
+    return processing.cross_spectra(wnddict, var, nperseg=NPERSEG)
+
+
+def main(nt: int = 720, ny: int = 90, nx: int = 180) -> None:
+    wnddict = {
+        k: synthetic_product(nt, ny, nx, seed=s) for s, k in enumerate("abcd")
+    }
+    rows = []
+    for name, func in [("repeated scipy calls", repeated), ("shared FFTs", shared)]:
+        seconds, peak = best_of(1, func, wnddict, "eastward_wind")
+        rows.append((name, f"{seconds:.2f}", f"{peak / 2 ** 20:.0f}"))
+    nbytes = wnddict["a"].eastward_wind.nbytes
+    print(f"4 products of {nt}x{ny}x{nx}, {nbytes / 2 ** 20:.0f} MiB per variable")
+    report(rows, ("variant", "s", "peak MiB"))
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:]])
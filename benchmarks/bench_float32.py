@@ -0,0 +1,38 @@
+"""
+Runtime and peak memory of the stresses and transports in float64 and float32.
+
+Usage: ``python benchmarks/bench_float32.py [nt ny nx]``
+"""
+
+import sys
+
+import numpy as np
+
+from common import best_of, report, synthetic_product
+
+from windeval import processing
+
+
+TARGETS = [
+    "sverdrup_transport",
+    "northward_ekman_transport",
+    "eastward_ekman_transport",
+]
+
+
+def main(nt: int = 48, ny: int = 360, nx: int = 720) -> None:
+    rows = []
+    for dtype in ["float64", "float32"]:
+        X = synthetic_product(nt, ny, nx, dtype=np.dtype(dtype))
+        for name, fused in [("BulkFormula", False), ("BulkFormula, fused", True)]:
+            B = processing.BulkFormula("large_and_pond_1981", fused=fused, dtype=dtype)
+            t, m = best_of(3, B.calculate, X, "eastward_wind", extend_ranges=True)
+            rows.append((name, dtype, f"{t * 1e3:.0f}", f"{m / 2 ** 20:.0f}"))
+        t, m = best_of(3, lambda: processing.compute(X.copy(), TARGETS, dtype=dtype))
+        rows.append(("transports", dtype, f"{t * 1e3:.0f}", f"{m / 2 ** 20:.0f}"))
+    print(f"grid {nt}x{ny}x{nx}, inputs of the same type")
+    report(rows, ("calculation", "dtype", "ms", "peak MiB"))
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:]])
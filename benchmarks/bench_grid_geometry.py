@@ -0,0 +1,44 @@
+"""
+Transports of many single time slices on one grid, with and without sharing the
+grid geometry between calls.
+
+Usage: ``python benchmarks/bench_grid_geometry.py [nt ny nx]``
+"""
+
+import sys
+
+from common import report, synthetic_product, wall_time
+
+from windeval import processing
+
+
+TRANSPORTS = [
+    processing.northward_ekman_transport,
+    processing.eastward_ekman_transport,
+    processing.sverdrup_transport,
+]
+
+
+def slices(X, shared):
+    for t in range(X.sizes["time"]):
+        if not shared:
+            processing._cached_grid_geometry.cache_clear()
+        Y = X.isel(time=slice(t, t + 1))
+        for f in TRANSPORTS:
+            f(Y)
+
+
+def main(nt: int = 500, ny: int = 180, nx: int = 360) -> None:
+    X = synthetic_product(nt, ny, nx)
+    processing.surface_downward_eastward_stress(X)
+    processing.surface_downward_northward_stress(X)
+    rows = [
+        (k, f"{wall_time(3, slices, X, shared) * 1e3 / nt:.2f}")
+        for k, shared in [("geometry per call", False), ("shared geometry", True)]
+    ]
+    print(f"{nt} time slices of {ny}x{nx}, ms per slice for all transports")
+    report(rows, ("variant", "ms"))
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:]])
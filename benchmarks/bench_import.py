@@ -0,0 +1,88 @@
+"""
+Import time of windeval and its submodules, each in a fresh interpreter, and the
+heavy dependencies they pull in.
+
+With ``--check`` the script fails if a module imports a dependency it should only
+import on first use, or takes longer to import than its budget relative to
+importing xarray, which every submodule needs.
+
+Usage: ``python benchmarks/bench_import.py [--check] [--repeat N]``
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+from typing import Dict, List, Set, Tuple
+
+from common import report
+
+
+HEAVY = ["xarray", "pandas", "scipy", "scipy.signal", "scipy.spatial", "matplotlib"]
+
+TARGETS: Dict[str, Tuple[List[str], float]] = {
+    # module: (heavy modules it must not import, budget relative to xarray)
+    "windeval": (HEAVY, 0.1),
+    "windeval.processing": (["scipy.signal", "matplotlib"], 1.5),
+    "windeval.io.api": (["scipy", "matplotlib"], 1.5),
+    "windeval.plotting": (["scipy", "matplotlib"], 1.5),
+}
+
+
+def import_time(module: str) -> Tuple[float, Set[str]]:
+    """Seconds to import `module` in a fresh interpreter and the heavy modules."""
+    code = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        f"import {module}\n"
+        "print(time.perf_counter() - start)\n"
+        f"print(' '.join(m for m in {HEAVY!r} if m in sys.modules))\n"
+    )
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=env,
+    ).stdout.split("\n")
+
+    return float(out[0]), set(out[1].split())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--check", action="store_true")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    def best(module: str) -> Tuple[float, Set[str]]:
+        runs = [import_time(module) for _ in range(args.repeat)]
+        return min(r[0] for r in runs), runs[0][1]
+
+    baseline, _ = best("xarray")
+    rows = [("xarray", f"{baseline * 1e3:.0f}", "", "")]
+    failures = []
+    for module, (forbidden, budget) in TARGETS.items():
+        seconds, imported = best(module)
+        rows.append(
+            (
+                module,
+                f"{seconds * 1e3:.0f}",
+                f"{budget * baseline * 1e3:.0f}",
+                " ".join(sorted(imported)) or "-",
+            )
+        )
+        if set(forbidden) & imported:
+            failures.append(f"{module} imports {sorted(set(forbidden) & imported)}")
+        if seconds > budget * baseline:
+            failures.append(f"{module} takes {seconds * 1e3:.0f} ms to import")
+    report(rows, ("module", "ms", "budget ms", "heavy modules"))
+
+    if args.check and failures:
+        sys.exit("\n".join(failures))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Time to open a product stored as one file per day.
+
+Usage: ``python benchmarks/bench_open_product.py [ndays ny nx]``
+"""
+
+import os
+import sys
+import tempfile
+
+import xarray as xr
+
+from common import report, synthetic_product, wall_time
+
+from windeval.io import products
+
+
+def eager(files):
+    return xr.concat([xr.load_dataset(f) for f in files], "time")
+
+
+def main(ndays: int = 100, ny: int = 180, nx: int = 360) -> None:
+    X = synthetic_product(4 * ndays, ny, nx)
+    with tempfile.TemporaryDirectory() as path:
+        for d in range(ndays):
+            X.isel(time=slice(4 * d, 4 * d + 4)).to_netcdf(
+                os.path.join(path, f"day_{d:05d}.nc")
+            )
+        pattern = os.path.join(path, "day_*.nc")
+        files = products._files(pattern)
+        variants = {
+            "load and concatenate": lambda: eager(files),
+            "open_product": lambda: products._open(pattern, None, True),
+            "open_product, serial": lambda: products._open(pattern, None, False),
+            "open_product, nested": lambda: products._open(
+                pattern, None, True, combine="nested", concat_dim="time"
+            ),
+        }
+        rows = [(k, f"{wall_time(1, f):.2f}") for k, f in variants.items()]
+    print(f"{ndays} daily files of 4x{ny}x{nx}, seconds for one product")
+    report(rows, ("variant", "s"))
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,43 @@
+"""
+Scaling of the dict-of-datasets API over worker processes.
+
+Runs the Welch diagnostic and saving for six products with 1, 2, 4 and 8 workers
+and without a pool.
+
+Usage: ``python benchmarks/bench_products_parallel.py [nt ny nx]``
+"""
+
+import os
+import sys
+import tempfile
+
+from common import report, synthetic_product, wall_time
+
+from windeval import processing
+from windeval.io import products
+
+
+def main(nt: int = 96, ny: int = 180, nx: int = 360) -> None:
+    wnddict = {f"product_{i}": synthetic_product(nt, ny, nx, seed=i) for i in range(6)}
+    rows = []
+    with tempfile.TemporaryDirectory() as path:
+        for n in [None, 1, 2, 4, 8]:
+            t0 = wall_time(
+                1,
+                lambda: processing.diagnostics(
+                    dict(wnddict), "eastward_wind", "welch", n_workers=n
+                ),
+            )
+            t1 = wall_time(
+                1,
+                lambda: products.save_product(
+                    wnddict, path, experimental=True, n_workers=n
+                ),
+            )
+            rows.append((str(n), f"{t0:.2f}", f"{t1:.2f}"))
+    print(f"6 products of {nt}x{ny}x{nx} on {os.cpu_count()} CPUs, seconds")
+    report(rows, ("n_workers", "welch", "save_product"))
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:]])
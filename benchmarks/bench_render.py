@@ -0,0 +1,67 @@
+"""
+Drawing a long hourly series and a map with pyplot on the full data or rendering
+them off-screen downsampled to the figure size, and rendering maps of several
+products in parallel.
+
+Usage: ``python benchmarks/bench_render.py [nt ny nx]``
+"""
+
+import sys
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt  # noqa: E402
+
+from common import measure, report, synthetic_product, wall_time  # noqa: E402
+
+from windeval import plotting  # noqa: E402
+
+
+def full(da):
+    fig = plt.figure(figsize=(8, 4.5), dpi=100)
+    da.plot()
+    fig.savefig("/dev/null", format="png")
+    plt.close(fig)
+
+
+def main(nt: int = 87600, ny: int = 720, nx: int = 1440) -> None:
+    series = synthetic_product(nt, 1, 1)[["eastward_wind"]].squeeze()
+    series["eastward_wind"] = series.eastward_wind.cumsum("time")
+    maps = synthetic_product(1, ny, nx)[["eastward_wind"]].squeeze()
+    rows = []
+    for name, ds, methods in [
+        ("series", series, ["minmax", "lttb"]),
+        ("map", maps, ["minmax"]),
+    ]:
+        rows.append(
+            (
+                f"{name}, pyplot full",
+                wall_time(3, full, ds.eastward_wind),
+                measure(full, ds.eastward_wind)[1],
+            )
+        )
+        for method in methods:
+            args = (plotting.render, {"a": ds}, "eastward_wind")
+            seconds = wall_time(3, *args, method=method)
+            _, peak = measure(*args, method=method)
+            label = method if name == "series" else "coarsened"
+            rows.append((f"{name}, render {label}", seconds, peak))
+    print(f"series of {nt} hours, map of {ny}x{nx}")
+    report(
+        [(k, f"{s * 1e3:.0f}", f"{p / 2 ** 20:.1f}") for k, s, p in rows],
+        ("variant", "ms", "peak MiB"),
+    )
+
+    wnddict = {f"p{i}": maps for i in range(4)}
+    rows = [
+        (str(n), wall_time(1, plotting.render, wnddict, "eastward_wind", n_workers=n))
+        for n in [None, 2]
+    ]
+    print(f"maps of {len(wnddict)} products")
+    report([(n, f"{s * 1e3:.0f}") for n, s in rows], ("n_workers", "ms"))
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:]])
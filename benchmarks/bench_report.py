@@ -0,0 +1,36 @@
+"""
+Writing a report of three products from scratch, again after one product changed
+and again without changes.
+
+Usage: ``python benchmarks/bench_report.py [nt ny nx]``
+"""
+
+import sys
+import tempfile
+
+from common import report, synthetic_product, wall_time
+
+from windeval.io import reports
+
+
+VARIABLES = ["eastward_wind", "northward_wind"]
+
+
+def run(wnd, tmpdir):
+    return reports.report(wnd, tmpdir, VARIABLES, nperseg=48)
+
+
+def main(nt: int = 168, ny: int = 180, nx: int = 360) -> None:
+    wnd = {k: synthetic_product(nt, ny, nx, seed=s) for s, k in enumerate("abc")}
+    rows = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        rows.append(("from scratch", wall_time(1, run, wnd, tmpdir)))
+        wnd["c"] = synthetic_product(nt, ny, nx, seed=3)
+        rows.append(("one product changed", wall_time(1, run, wnd, tmpdir)))
+        rows.append(("unchanged", wall_time(1, run, wnd, tmpdir)))
+    print(f"3 products of {nt}x{ny}x{nx}, {len(VARIABLES)} variables")
+    report([(k, f"{s:.2f}") for k, s in rows], ("run", "s"))
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,64 @@
+"""
+Throughput and output size of save_product for several encodings.
+
+Usage: ``python benchmarks/bench_save_product.py [nt ny nx]``
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+
+from common import report, synthetic_product, wall_time
+
+from windeval.io import products
+
+
+def size(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(
+        os.path.getsize(os.path.join(d, f)) for d, _, fs in os.walk(path) for f in fs
+    )
+
+
+def main(nt: int = 120, ny: int = 180, nx: int = 360) -> None:
+    # random winds compress worse than real ones, sizes are an upper bound
+    X = synthetic_product(nt, ny, nx)
+    X = X.round(2)
+    mb = X.nbytes / 2 ** 20
+    variants = {
+        "netcdf": {},
+        "netcdf, zlib 1": {"complevel": 1},
+        "netcdf, zlib 4": {"complevel": 4},
+        "netcdf, zlib 1, float32": {"complevel": 1, "dtype": "float32"},
+        "netcdf, zlib 1, float32, map": {
+            "complevel": 1,
+            "dtype": "float32",
+            "chunks": "map",
+        },
+        "zarr": {"target": "zarr"},
+        "zarr, float32, map": {"target": "zarr", "dtype": "float32", "chunks": "map"},
+    }
+    rows = []
+    for k, kwargs in variants.items():
+        path = tempfile.mkdtemp()
+        try:
+            t = wall_time(
+                1,
+                products.save_product,
+                {"a": X},
+                path,
+                experimental=True,
+                **kwargs,
+            )
+            out = size(os.path.join(path, os.listdir(path)[0])) / 2 ** 20
+        finally:
+            shutil.rmtree(path)
+        rows.append((k, f"{t:.2f}", f"{mb / t:.0f}", f"{out:.1f}"))
+    print(f"one product of {nt}x{ny}x{nx}, {mb:.0f} MB in memory")
+    report(rows, ("variant", "s", "MB/s", "MB on disk"))
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,82 @@
+"""
+Reading a region, a period and stations of a product saved in several files, by
+loading and slicing it or by selecting before loading, and nearest grid point
+lookup of many stations by brute force or with the shared KD-tree.
+
+Usage: ``python benchmarks/bench_select.py [nt ny nx n_stations]``
+"""
+
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+from common import best_of, report, synthetic_product, wall_time
+
+from windeval._spatial import GridIndex, grid_index
+from windeval.io import products
+
+
+BBOX = (-20.0, -10.0, 20.0, 10.0)
+TIME = (24, 47)
+
+
+def load_then_slice(paths):
+    ds = products.open_product(*paths, "a", "b", experimental=True)["a"].load()
+    lon = (ds.longitude + 180) % 360 - 180
+    return ds.sel(time=slice(*TIME)).where(
+        (lon >= BBOX[0]) & (lon <= BBOX[2]) & (abs(ds.latitude) <= BBOX[3]), drop=True
+    )
+
+
+def select(paths):
+    wnddict = products.open_product(*paths, "a", "b", experimental=True)
+    return products.select(wnddict, bbox=BBOX, time=TIME)["a"].load()
+
+
+def brute_force(lat, lon, points):
+    glat, glon = np.meshgrid(np.deg2rad(lat), np.deg2rad(lon), indexing="ij")
+    plat, plon = np.deg2rad(points[:, 1:]), np.deg2rad(points[:, :1])
+    cos = np.sin(plat) * np.sin(glat.ravel()) + np.cos(plat) * np.cos(
+        glat.ravel()
+    ) * np.cos(plon - glon.ravel())
+    return np.unravel_index(np.argmax(cos, axis=1), glat.shape)
+
+
+def main(nt: int = 168, ny: int = 180, nx: int = 360, n: int = 2000) -> None:
+    X = synthetic_product(nt, ny, nx)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        # one file per day, as products are usually distributed
+        days = [X.isel(time=slice(t, t + 24)) for t in range(0, nt, 24)]
+        paths = []
+        for d, ds in enumerate(days):
+            paths.append(os.path.join(tmpdir, f"day_{d}.nc"))
+            ds.to_netcdf(paths[-1])
+        paths = [os.path.join(tmpdir, "day_*.nc"), paths[:1]]
+        for name, func in [("load then slice", load_then_slice), ("select", select)]:
+            seconds, peak = best_of(3, func, paths)
+            rows.append((name, f"{seconds * 1e3:.1f}", f"{peak / 2 ** 20:.1f}"))
+    print(f"{nt}x{ny}x{nx} in {len(days)} files, region {BBOX}, time {TIME}")
+    report(rows, ("variant", "ms", "peak MiB"))
+
+    rng = np.random.default_rng(0)
+    points = np.stack([rng.uniform(-180, 180, n), rng.uniform(-60, 60, n)], axis=-1)
+    lat, lon = X.latitude.values, X.longitude.values
+    grid_index(lat, lon)
+    rows = [
+        ("brute force", wall_time(3, brute_force, lat, lon, points)),
+        ("KD-tree, built per call", wall_time(3, lookup, GridIndex, lat, lon, points)),
+        ("KD-tree, shared", wall_time(3, lookup, grid_index, lat, lon, points)),
+    ]
+    print(f"{n} stations on {ny}x{nx}")
+    report([(k, f"{s * 1e3:.1f}") for k, s in rows], ("variant", "ms"))
+
+
+def lookup(index, lat, lon, points):
+    return index(lat, lon).query(points[:, 1], points[:, 0])
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:]])
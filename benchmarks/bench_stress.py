@@ -0,0 +1,45 @@
+"""
+Runtime and peak memory of the separate and the combined wind stress functions.
+
+Usage: ``python benchmarks/bench_stress.py [nt ny nx]``
+"""
+
+import sys
+
+from common import best_of, report, synthetic_product
+
+from windeval import processing
+
+
+def separate(X, drag_coefficient):
+    processing.surface_downward_eastward_stress(X, drag_coefficient)
+    processing.surface_downward_northward_stress(X, drag_coefficient)
+    processing.wind_speed(X)
+
+
+def main(nt: int = 24, ny: int = 360, nx: int = 720) -> None:
+    X = synthetic_product(nt, ny, nx)
+    nbytes = X.eastward_wind.nbytes
+    variants = {
+        "separate": separate,
+        "combined": lambda X, cd: processing.surface_downward_stress(
+            X, cd, with_wind_speed=True
+        ),
+        "vector": lambda X, cd: processing.surface_downward_stress(
+            X, cd, vector=True, with_wind_speed=True
+        ),
+        "vector fused": lambda X, cd: processing.surface_downward_stress(
+            X, cd, vector=True, with_wind_speed=True, fused=True
+        ),
+    }
+    rows = []
+    for cd in ["ncep_ncar_2007", "large_and_pond_1981", "yelland_and_taylor_1996"]:
+        for name, f in variants.items():
+            t, m = best_of(3, lambda: f(X.copy(), cd))
+            rows.append((cd, name, f"{t * 1e3:.0f}", f"{m / nbytes:.1f}"))
+    print(f"grid {nt}x{ny}x{nx}, peak memory in multiples of one field")
+    report(rows, ("drag_coefficient", "variant", "ms", "peak"))
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,44 @@
+"""
+Runtime and peak memory of :func:`windeval.processing.sverdrup_transport` on the
+whole grid and tile by tile, in this process, in worker processes and on Dask
+chunks of the grid.
+
+Usage: ``python benchmarks/bench_sverdrup.py [nt ny nx]``
+"""
+
+import sys
+
+from common import measure, report, synthetic_product, wall_time
+
+from windeval import processing
+
+
+def main(nt: int = 24, ny: int = 720, nx: int = 1440) -> None:
+    X = synthetic_product(nt, ny, nx)
+    processing.surface_downward_eastward_stress(X)
+    processing.surface_downward_northward_stress(X)
+    nbytes = X.surface_downward_eastward_stress.nbytes
+
+    tile = (ny // 4, nx // 4)
+    chunked = X.chunk({"latitude": tile[0], "longitude": tile[1]})
+    rows = []
+    for label, ds, kwargs in [
+        ("whole grid", X, {}),
+        (f"tiles {tile[0]}x{tile[1]}", X, {"tile": tile}),
+        (f"tiles {tile[0]}x{tile[1]}, 2 workers", X, {"tile": tile, "n_workers": 2}),
+        ("dask chunks", chunked, {}),
+    ]:
+
+        def run():
+            processing.sverdrup_transport(ds.copy(), **kwargs).sverdrup_transport.load()
+
+        rows.append((label, wall_time(3, run), measure(run)[1]))
+    print(f"grid {nt}x{ny}x{nx}, peak memory in multiples of the output size")
+    report(
+        [(k, f"{t * 1e3:.0f}", f"{m / nbytes:.2f}") for k, t, m in rows],
+        ("variant", "ms", "peak"),
+    )
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:]])
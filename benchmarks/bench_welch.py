@@ -0,0 +1,40 @@
+"""
+Per grid point Welch spectra: loop over points, batched call and chunked evaluation.
+
+Usage: ``python benchmarks/bench_welch.py [nt ny nx]``
+"""
+
+import sys
+
+from common import best_of, report, synthetic_product, wall_time
+from scipy import signal
+
+from windeval import processing
+
+
+def loop(da):
+    x = da.values
+    for j in range(x.shape[1]):
+        for i in range(x.shape[2]):
+            signal.welch(x[:, j, i], nperseg=256)
+
+
+def main(nt: int = 2000, ny: int = 45, nx: int = 90) -> None:
+    da = synthetic_product(nt, ny, nx).eastward_wind
+    welch = processing.Diagnostics.welch
+    rows = [("loop over points", f"{wall_time(1, loop, da):.2f}", "")]
+    t, m = best_of(1, lambda: welch(da, dim="time", nperseg=256))
+    rows.append(("batched", f"{t:.2f}", f"{m / da.nbytes:.1f}"))
+    try:
+        chunked = da.chunk({"latitude": 10})
+    except ImportError:
+        pass
+    else:
+        t, m = best_of(1, lambda: welch(chunked, dim="time", nperseg=256).load())
+        rows.append(("batched, chunked", f"{t:.2f}", f"{m / da.nbytes:.1f}"))
+    print(f"{nt}x{ny}x{nx}, peak memory in multiples of the input")
+    report(rows, ("variant", "s", "peak"))
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:]])
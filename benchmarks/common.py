@@ -0,0 +1,115 @@
+"""
+Shared helpers of the benchmark scripts.
+"""
+
+import resource
+import sys
+import time
+import tracemalloc
+
+from typing import Any, Callable, Tuple
+
+import numpy as np
+import xarray as xr
+
+
+def measure(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Tuple[float, int]:
+    """Run `func` once and return wall time in seconds and traced peak memory in bytes.
+
+    Memory is measured with :mod:`tracemalloc`, which also traces NumPy buffers, and
+    is relative to the memory allocated before the call.
+
+    """
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return elapsed, peak
+
+
+def best_of(
+    repeat: int, func: Callable[..., Any], *args: Any, **kwargs: Any
+) -> Tuple[float, int]:
+    """Fastest wall time and largest peak memory of `repeat` runs of `func`."""
+    results = [measure(func, *args, **kwargs) for _ in range(repeat)]
+
+    return min(r[0] for r in results), max(r[1] for r in results)
+
+
+def wall_time(
+    repeat: int, func: Callable[..., Any], *args: Any, **kwargs: Any
+) -> float:
+    """Fastest wall time of `repeat` runs of `func` without memory tracing.
+
+    Use this where worker processes or many small allocations make
+    :mod:`tracemalloc` either blind or too slow.
+
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args, **kwargs)
+        times.append(time.perf_counter() - start)
+
+    return min(times)
+
+
+def reset_peak_rss() -> bool:
+    """Reset the peak resident set size of this process, where Linux allows it."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        return False
+
+    return True
+
+
+def peak_rss() -> int:
+    """Peak resident set size of this process in bytes."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def synthetic_product(
+    nt: int, ny: int, nx: int, seed: int = 0, dtype: Any = np.float64
+) -> xr.Dataset:
+    """Gridded wind product with random winds on a regular global grid."""
+    rng = np.random.default_rng(seed)
+    shape = (nt, ny, nx)
+    dims = ("time", "latitude", "longitude")
+    ds = xr.Dataset(
+        {
+            "eastward_wind": (dims, (rng.standard_normal(shape) * 8).astype(dtype)),
+            "northward_wind": (dims, (rng.standard_normal(shape) * 8).astype(dtype)),
+            "air_density": (dims, np.full(shape, 1.22, dtype=dtype)),
+            "sea_surface_temperature": (dims, np.full(shape, 290.0, dtype=dtype)),
+            "air_temperature": (dims, np.full(shape, 289.0, dtype=dtype)),
+        },
+        coords={
+            "time": np.arange(nt),
+            "latitude": np.linspace(-89.875, 89.875, ny),
+            "longitude": np.linspace(0.125, 359.875, nx),
+        },
+    )
+
+    return ds
+
+
+def report(rows: list, header: Tuple[str, ...]) -> None:
+    """Print `rows` as an aligned plain text table."""
+    widths = [max(len(str(x)) for x in col) for col in zip(header, *rows)]
+    for row in [header, *rows]:
+        print("  ".join(str(x).rjust(w) for x, w in zip(row, widths)))
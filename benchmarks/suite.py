@@ -0,0 +1,274 @@
+"""
+Benchmark suite of the processing, diagnostics and IO functions.
+
+Each benchmark runs in a fresh process on a synthetic product of one size tier and
+records the fastest wall time, the peak resident set size and the peak traced by
+:mod:`tracemalloc`. Results are saved as JSON named after the current commit, so
+runs of different commits can be compared.
+
+Usage::
+
+    python benchmarks/suite.py list
+    python benchmarks/suite.py run [--tiers xs,s] [--filter REGEX] [--repeat N]
+    python benchmarks/suite.py compare OLD.json NEW.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+from typing import Any, Callable, Dict, Tuple
+
+import numpy as np
+import xarray as xr
+
+from common import (
+    measure,
+    peak_rss,
+    report,
+    reset_peak_rss,
+    synthetic_product,
+    wall_time,
+)
+
+from windeval import processing
+from windeval.io import products
+
+
+TIERS: Dict[str, Tuple[int, int, int]] = {
+    "xs": (24, 45, 90),  # one day hourly, 4°
+    "s": (168, 180, 360),  # one week hourly, 1°
+    "m": (720, 360, 720),  # one month hourly, 0.5°
+    "l": (8760, 720, 1440),  # one year hourly, 0.25°
+}
+"""Time, latitude and longitude sizes of the synthetic products by tier."""
+
+RESULTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+Setup = Callable[[xr.Dataset, str], Callable[[], Any]]
+
+
+def _drag(coefficient: str) -> Setup:
+    def setup(X: xr.Dataset, tmpdir: str) -> Callable[[], Any]:
+        bulk_formula = processing.BulkFormula(coefficient)
+        return lambda: bulk_formula.calculate(X, "eastward_wind")
+
+    return setup
+
+
+def _processing(name: str, *stresses: str) -> Setup:
+    def setup(X: xr.Dataset, tmpdir: str) -> Callable[[], Any]:
+        for s in stresses:
+            processing.DERIVED_VARIABLES[s][0](X)
+        f = processing.DERIVED_VARIABLES[name][0]
+        return lambda: f(X)
+
+    return setup
+
+
+def _welch(X: xr.Dataset, tmpdir: str) -> Callable[[], Any]:
+    return lambda: processing.Diagnostics.welch(X.eastward_wind, dim="time")
+
+
+def _round_trip(X: xr.Dataset, tmpdir: str) -> Callable[[], Any]:
+    def run() -> None:
+        products.save_product({"a": X, "b": X}, tmpdir, experimental=True)
+        wnddict = products.open_product(
+            os.path.join(tmpdir, "a.cdf"),
+            os.path.join(tmpdir, "b.cdf"),
+            experimental=True,
+        )
+        for ds in wnddict.values():
+            ds.load().close()
+
+    return run
+
+
+EAST = "surface_downward_eastward_stress"
+NORTH = "surface_downward_northward_stress"
+
+BENCHMARKS: Dict[str, Setup] = {
+    **{
+        f"drag.{c}": _drag(c)
+        for c in [
+            "ncep_ncar_2007",
+            "large_and_pond_1981",
+            "yelland_and_taylor_1996",
+            "kara_etal_2000",
+            "trenberth_etal_1990",
+            "large_and_yeager_2004",
+        ]
+    },
+    "wind_speed": _processing("wind_speed"),
+    EAST: _processing(EAST),
+    NORTH: _processing(NORTH),
+    "northward_ekman_transport": _processing("northward_ekman_transport", EAST),
+    "eastward_ekman_transport": _processing("eastward_ekman_transport", NORTH),
+    "sverdrup_transport": _processing("sverdrup_transport", EAST, NORTH),
+    "welch": _welch,
+    "save_open_product": _round_trip,
+}
+"""Benchmarks by name, functions of a product and a scratch directory that prepare
+the product and return the call to measure."""
+
+
+def run_one(name: str, tier: str, repeat: int) -> Dict[str, Any]:
+    """Measure benchmark `name` on a product of `tier` in this process."""
+    X = synthetic_product(*TIERS[tier])
+    with tempfile.TemporaryDirectory() as tmpdir:
+        func = BENCHMARKS[name](X, tmpdir)
+        func()
+        reset = reset_peak_rss()
+        rss = peak_rss()
+        seconds = wall_time(repeat, func)
+        rss_peak = peak_rss()
+        _, traced = measure(func)
+
+    return {
+        "name": name,
+        "tier": tier,
+        "shape": TIERS[tier],
+        "seconds": seconds,
+        "rss_peak": rss_peak,
+        "rss_increase": rss_peak - rss if reset else None,
+        "tracemalloc_peak": traced,
+    }
+
+
+def _commit() -> str:
+    try:
+        sha = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+    return sha + ("-dirty" if dirty else "")
+
+
+def run(tiers: str, pattern: str, repeat: int, output: str) -> str:
+    """Run the matching benchmarks in fresh processes and save their results."""
+    results = []
+    for tier in tiers.split(","):
+        for name in BENCHMARKS:
+            if not re.search(pattern, name):
+                continue
+            proc = subprocess.run(
+                [sys.executable, __file__, "_one", name, tier, str(repeat)],
+                capture_output=True,
+                text=True,
+            )
+            if proc.returncode != 0:
+                print(f"{name} [{tier}] failed:\n{proc.stderr}", file=sys.stderr)
+                results.append({"name": name, "tier": tier, "error": proc.stderr})
+                continue
+            results.append(json.loads(proc.stdout.splitlines()[-1]))
+            _print([results[-1]])
+    commit = _commit()
+    doc = {
+        "commit": commit,
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": {
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "xarray": xr.__version__,
+        },
+        "results": results,
+    }
+    path = output or os.path.join(RESULTS, f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(doc, f, indent=1)
+
+    return path
+
+
+def _print(results: list) -> None:
+    for r in results:
+        if "error" in r:
+            continue
+        increase = r["rss_increase"]
+        print(
+            f"{r['name']:>40} [{r['tier']:>2}]  {r['seconds']:9.4f} s"
+            f"  RSS {r['rss_peak'] / 2 ** 20:8.1f} MiB"
+            f" (+{increase / 2 ** 20 if increase is not None else float('nan'):.1f})"
+            f"  traced {r['tracemalloc_peak'] / 2 ** 20:8.1f} MiB",
+            flush=True,
+        )
+
+
+def compare(old: str, new: str) -> None:
+    """Print the ratios of time and memory between two result files."""
+    docs = []
+    for path in [old, new]:
+        with open(path) as f:
+            docs.append(json.load(f))
+    before = {(r["name"], r["tier"]): r for r in docs[0]["results"] if "error" not in r}
+    rows = []
+    for r in docs[1]["results"]:
+        b = before.get((r["name"], r["tier"]))
+        if b is None or "error" in r:
+            continue
+        rows.append(
+            (
+                r["name"],
+                r["tier"],
+                f"{b['seconds']:.4f}",
+                f"{r['seconds']:.4f}",
+                f"{r['seconds'] / b['seconds']:.2f}",
+                f"{r['tracemalloc_peak'] / max(b['tracemalloc_peak'], 1):.2f}",
+            )
+        )
+    print(f"{docs[0]['commit']} -> {docs[1]['commit']}, ratios new / old")
+    report(rows, ("benchmark", "tier", "old s", "new s", "time", "traced"))
+
+
+def main() -> None:
+    if len(sys.argv) > 1 and sys.argv[1] == "_one":
+        name, tier, repeat = sys.argv[2:5]
+        print(json.dumps(run_one(name, tier, int(repeat))))
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="list benchmarks and tiers")
+    p = commands.add_parser("run", help="run benchmarks")
+    p.add_argument("--tiers", default="xs,s", help=f"comma separated, of {list(TIERS)}")
+    p.add_argument("--filter", default="", help="regular expression of names")
+    p.add_argument("--repeat", type=int, default=3, help="runs, the fastest counts")
+    p.add_argument("--output", default="", help="result file, defaults to the commit")
+    p = commands.add_parser("compare", help="compare two result files")
+    p.add_argument("old")
+    p.add_argument("new")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for t, shape in TIERS.items():
+            print(f"tier {t}: {'x'.join(map(str, shape))}")
+        for name in BENCHMARKS:
+            print(name)
+    elif args.command == "run":
+        print(run(args.tiers, args.filter, args.repeat, args.output))
+    else:
+        compare(args.old, args.new)
+
+
+if __name__ == "__main__":
+    main()
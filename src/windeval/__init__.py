@@ -1,8 +1,13 @@
-from . import plotting, processing
-from .io import api as io
-from .io.api import info, open_product, report, save_product, select
-from .plotting import plot
-from .processing import conversions, diagnostics
+"""
+Evaluation of wind products.
+
+Submodules and their dependencies, e.g. :mod:`matplotlib` and :mod:`scipy`, are
+imported on first use of the names below, so ``import windeval`` is fast, e.g. in
+worker processes.
+"""
+
+from importlib import import_module
+from typing import Any, List
 
 
 __all__ = [
@@ -20,3 +25,34 @@ __all__ = [
     "plot",
     "report",
 ]
+
+_LAZY = {
+    "io": (".io.api", None),
+    "processing": (".processing", None),
+    "plotting": (".plotting", None),
+    "open_product": (".io.api", "open_product"),
+    "save_product": (".io.api", "save_product"),
+    "info": (".io.api", "info"),
+    "select": (".io.api", "select"),
+    "conversions": (".processing", "conversions"),
+    "diagnostics": (".processing", "diagnostics"),
+    "plot": (".plotting", "plot"),
+    "report": (".io.api", "report"),
+}
+"""Module and attribute of each name of :data:`__all__`."""
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module, attr = _LAZY[name]
+    value = import_module(module, __name__)
+    if attr is not None:
+        value = getattr(value, attr)
+    globals()[name] = value
+
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,170 @@
+"""
+Persistent on-disk cache of derived variables.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+import numpy as np
+import xarray as xr
+
+
+class Cache:
+    """Least recently used cache of derived variables in a directory.
+
+    Entries are netCDF files named after their key and survive the process, so
+    reruns of a notebook or batch job load results instead of calculating them.
+    Keys are built by the caller from :func:`fingerprint` of the inputs and the
+    parameters of the calculation. When the files exceed `max_bytes` the least
+    recently used ones are removed.
+
+    Parameters
+    ----------
+    directory : str or path
+        Directory of the cache files, created if missing.
+    max_bytes : int, optional
+        Size limit of the cache files, defaults to 1 GiB.
+
+    Attributes
+    ----------
+    hits, misses, evictions : int
+        Number of lookups that found an entry, of lookups that did not and of entries
+        removed to stay below `max_bytes`, since the cache was created.
+
+    """
+
+    def __init__(self, directory: Union[str, Path], max_bytes: int = 2 ** 30):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(*parts: str) -> str:
+        """Key of an entry from strings identifying its inputs and parameters."""
+        h = hashlib.sha256()
+        for p in parts:
+            h.update(p.encode())
+            h.update(b"\0")
+
+        return h.hexdigest()[:32]
+
+    def _path(self, key: str) -> Path:
+        return self.directory.joinpath(key + ".nc")
+
+    def get(self, key: str) -> Optional[xr.DataArray]:
+        """Entry of `key` loaded into memory, `None` if there is none."""
+        path = self._path(key)
+        try:
+            da = xr.load_dataarray(path)
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        da.encoding = {}
+        for v in da.coords.values():
+            v.encoding = {}
+
+        return da
+
+    def put(self, key: str, da: xr.DataArray) -> xr.DataArray:
+        """Store `da` as entry of `key` and return it loaded into memory.
+
+        Arrays larger than `max_bytes` are not stored and returned as they are, so
+        Dask arrays stay lazy.
+
+        """
+        if da.nbytes > self.max_bytes:
+            return da
+        da = da.load()
+        fd, tmp = tempfile.mkstemp(suffix=".tmp", dir=self.directory)
+        os.close(fd)
+        try:
+            da.to_netcdf(tmp)
+            os.replace(tmp, self._path(key))
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        self._evict()
+
+        return da
+
+    def _evict(self) -> None:
+        """Remove least recently used entries until the cache fits `max_bytes`."""
+        with self._lock:
+            entries = []
+            for p in self.directory.glob("*.nc"):
+                try:
+                    s = p.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((s.st_mtime_ns, s.st_size, p))
+            size = sum(e[1] for e in entries)
+            for _, nbytes, p in sorted(entries):
+                if size <= self.max_bytes:
+                    break
+                _unlink(p)
+                size -= nbytes
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            for p in self.directory.glob("*.nc"):
+                _unlink(p)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Hits, misses, evictions, number of entries and their size in bytes."""
+        with self._lock:
+            sizes = [p.stat().st_size for p in self.directory.glob("*.nc")]
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(sizes),
+                "bytes": sum(sizes),
+            }
+
+
+def _unlink(path: Path) -> None:
+    """Remove `path` if it still exists."""
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def fingerprint(da: xr.DataArray) -> str:
+    """Cheap identifier of the values of `da` and its coordinates.
+
+    Dask arrays are identified by their name, which Dask derives from the file
+    paths, modification times and operations they were created from. Other arrays
+    are hashed with SHA-256, which most processors accelerate in hardware.
+
+    """
+    h = hashlib.sha256()
+    for name, var in [(da.name, da.variable)] + sorted(
+        (str(k), v.variable) for k, v in da.coords.items()
+    ):
+        h.update(repr((name, var.dims, str(var.dtype), var.shape)).encode())
+        data = var.data
+        if hasattr(data, "dask"):
+            h.update(data.name.encode())
+        elif var.dtype.hasobject:
+            h.update(repr(np.asarray(data).tolist()).encode())
+        else:
+            h.update(np.ascontiguousarray(data).reshape(-1).view(np.uint8).data)
+
+    return h.hexdigest()[:32]
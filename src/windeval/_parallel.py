@@ -0,0 +1,196 @@
+"""
+Process pool execution of per-product work.
+"""
+
+import os
+import shutil
+import tempfile
+
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    wait,
+)
+from contextlib import ExitStack
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+import numpy as np
+import xarray as xr
+
+
+_SHARE_NBYTES = 2 ** 20
+"""Arrays of at least this many bytes are passed to workers as memory-mapped files."""
+
+_SHARED_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+"""Directory of the memory-mapped files, in memory where the system provides it."""
+
+K = TypeVar("K", bound=Hashable)
+
+
+def map_products(
+    func: Callable[..., Any],
+    wnddict: Mapping[K, xr.Dataset],
+    keys: Iterable[K],
+    *args: Any,
+    n_workers: Optional[int] = None,
+    executor: Optional[Executor] = None,
+    shared_dir: Optional[str] = None,
+    **kwargs: Any
+) -> Dict[K, Any]:
+    """Call `func` for each product in `keys`, in worker processes if requested.
+
+    Without `n_workers` and `executor` the products are processed one after another
+    in this process. Otherwise large NumPy arrays of a product are written to files
+    that the workers map into memory instead of receiving them pickled, Dask arrays
+    are passed as task graphs. The files of a product are written when it is
+    submitted and removed when its result arrives, with at most two products per
+    worker submitted at once. `func` and its results must be picklable.
+
+    Parameters
+    ----------
+    func : callable
+        Function called as ``func(key, ds, *args, **kwargs)`` for each product.
+    wnddict : dict
+        Wind products by name, or by any other hashable key.
+    keys : iterable
+        Keys of the products to process.
+    n_workers : int, optional
+        Number of processes of a new :class:`concurrent.futures.ProcessPoolExecutor`.
+    executor : concurrent.futures.Executor, optional
+        Executor to submit the work to instead of a new process pool.
+    shared_dir : str, optional
+        Directory of the memory-mapped files, defaults to ``/dev/shm`` where it
+        exists and has space for the arrays of a product, and to the directory of
+        :func:`tempfile.gettempdir` otherwise.
+
+    Returns
+    -------
+    dict
+        Results of `func` by key.
+
+    """
+    keys = list(keys)
+    if n_workers is None and executor is None:
+        return {k: func(k, wnddict[k], *args, **kwargs) for k in keys}
+
+    tmpdirs: Dict[K, str] = {}
+
+    def remove() -> None:
+        for d in tmpdirs.values():
+            shutil.rmtree(d, ignore_errors=True)
+
+    with ExitStack() as stack:
+        if executor is None:
+            executor = stack.enter_context(ProcessPoolExecutor(n_workers))
+        stack.callback(remove)
+        workers = n_workers or getattr(executor, "_max_workers", None) or len(keys)
+        futures: Dict[K, Future] = {}
+        results = {}
+        todo = iter(keys)
+        for k in keys:
+            for j in todo:
+                ds = wnddict[j]
+                tmpdirs[j] = tempfile.mkdtemp(dir=shared_dir or _shared_dir(ds))
+                shared = _share(ds, tmpdirs[j])
+                futures[j] = executor.submit(_call, func, j, shared, args, kwargs)
+                if len(futures) >= 2 * workers:
+                    break
+            while not futures[k].done():
+                wait(futures.values(), return_when=FIRST_COMPLETED)
+            results[k] = futures.pop(k).result()
+            shutil.rmtree(tmpdirs.pop(k), ignore_errors=True)
+
+    return results
+
+
+def _shared_dir(ds: xr.Dataset, nbytes: Optional[int] = None) -> Optional[str]:
+    """:data:`_SHARED_DIR` if it has space for the shared arrays of `ds`, else None.
+
+    Memory file systems are often small, for example 64 MiB in Docker containers,
+    in which case the files go to the temporary directory of the system.
+
+    """
+    if _SHARED_DIR is None:
+        return None
+    if nbytes is None:
+        nbytes = _SHARE_NBYTES
+    size = sum(
+        v.data.nbytes
+        for k, v in ds.variables.items()
+        if k not in ds.indexes
+        and isinstance(v.data, np.ndarray)
+        and v.data.nbytes >= nbytes
+    )
+    try:
+        free = shutil.disk_usage(_SHARED_DIR).free
+    except OSError:
+        return None
+
+    # keep room for other users of the file system
+    return _SHARED_DIR if 2 * size < free else None
+
+
+_Ref = Tuple[str, Tuple[Hashable, ...], Dict, Dict, bool]
+_Shared = Tuple[xr.Dataset, Dict[Hashable, _Ref], List[Hashable]]
+
+
+def _share(ds: xr.Dataset, tmpdir: str, nbytes: Optional[int] = None) -> _Shared:
+    """Move large NumPy variables of `ds` into files in `tmpdir`.
+
+    Returns `ds` without these variables, references to their files and the order
+    of the data variables.
+
+    """
+    if nbytes is None:
+        nbytes = _SHARE_NBYTES
+    refs: Dict[Hashable, _Ref] = {}
+    for name, var in ds.variables.items():
+        if name in ds.indexes or not isinstance(var.data, np.ndarray):
+            continue
+        if var.data.nbytes < nbytes or var.data.nbytes == 0:
+            continue
+        fd, path = tempfile.mkstemp(suffix=".npy", dir=tmpdir)
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, var.data)
+        refs[name] = (path, var.dims, var.attrs, var.encoding, name in ds.coords)
+
+    return ds.drop_vars(list(refs)), refs, list(ds.data_vars)
+
+
+def _attach(shared: _Shared) -> xr.Dataset:
+    """Rebuild a dataset from the result of :func:`_share` with read-only memmaps."""
+    ds, refs, order = shared
+    for name, (path, dims, attrs, encoding, coord) in refs.items():
+        # plain array views avoid the overhead of the memmap subclass in NumPy calls
+        data = np.asarray(np.load(path, mmap_mode="r"))
+        var = xr.Variable(dims, data, attrs, encoding)
+        if coord:
+            ds = ds.assign_coords({name: var})
+        else:
+            ds[name] = var
+
+    return ds[order]
+
+
+def _call(
+    func: Callable[..., Any],
+    key: Hashable,
+    shared: _Shared,
+    args: Tuple,
+    kwargs: Dict[str, Any],
+) -> Any:
+    """Worker side of :func:`map_products`."""
+    return func(key, _attach(shared), *args, **kwargs)
@@ -0,0 +1,224 @@
+"""
+Spatial index of product grids.
+"""
+
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+
+EARTH_RADIUS = 6371e3
+"""Mean radius of the Earth in m."""
+
+
+class GridIndex:
+    """Nearest grid point lookup on the sphere.
+
+    Grid points are indexed in a KD-tree by their position on the unit sphere, so
+    distances are chords and longitudes need no wrapping.
+
+    Parameters
+    ----------
+    latitude, longitude : array_like
+        Coordinates in degrees, 1-D of a regular grid or 2-D of a curvilinear grid.
+
+    """
+
+    def __init__(self, latitude: np.ndarray, longitude: np.ndarray):
+        from scipy.spatial import cKDTree
+
+        if np.ndim(latitude) == 1 and np.ndim(longitude) == 1:
+            lat, lon = np.meshgrid(latitude, longitude, indexing="ij")
+        else:
+            lat, lon = np.broadcast_arrays(latitude, longitude)
+        self.shape = lat.shape
+        self.tree = cKDTree(_unit_vectors(lat.ravel(), lon.ravel()))
+
+    def query(
+        self, latitude: np.ndarray, longitude: np.ndarray
+    ) -> Tuple[np.ndarray, Tuple[np.ndarray, ...]]:
+        """Great circle distance in m and grid indices of the nearest points.
+
+        Parameters
+        ----------
+        latitude, longitude : array_like
+            Coordinates in degrees of the points to look up.
+
+        Returns
+        -------
+        distance : numpy.ndarray
+            Distance of each point to its nearest grid point.
+        indices : tuple of numpy.ndarray
+            Indices of the nearest grid points along each grid dimension.
+
+        """
+        chord, i = self.tree.query(_unit_vectors(latitude, longitude))
+        distance = 2 * np.arcsin(np.minimum(chord / 2, 1.0)) * EARTH_RADIUS
+
+        return distance, np.unravel_index(i, self.shape)
+
+
+def _unit_vectors(latitude: np.ndarray, longitude: np.ndarray) -> np.ndarray:
+    lat = np.deg2rad(np.asarray(latitude, dtype=float))
+    lon = np.deg2rad(np.asarray(longitude, dtype=float))
+
+    return np.stack(
+        [np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1
+    )
+
+
+def grid_index(latitude: np.ndarray, longitude: np.ndarray) -> GridIndex:
+    """Shared :class:`GridIndex` of a grid, built once per set of coordinates."""
+    lat, lon = np.ascontiguousarray(latitude), np.ascontiguousarray(longitude)
+
+    return _cached_grid_index(
+        lat.dtype.str, lat.shape, lat.tobytes(), lon.dtype.str, lon.shape, lon.tobytes()
+    )
+
+
+@lru_cache(maxsize=8)
+def _cached_grid_index(
+    lat_dtype: str,
+    lat_shape: Tuple[int, ...],
+    lat: bytes,
+    lon_dtype: str,
+    lon_shape: Tuple[int, ...],
+    lon: bytes,
+) -> GridIndex:
+    return GridIndex(
+        np.frombuffer(lat, lat_dtype).reshape(lat_shape),
+        np.frombuffer(lon, lon_dtype).reshape(lon_shape),
+    )
+
+
+Stations = Union[Sequence[Sequence[float]], Dict[Any, Any]]
+
+
+def station_points(stations: Stations) -> Tuple[Optional[List[Any]], np.ndarray]:
+    """Names and ``(longitude, latitude)`` of stations.
+
+    Parameters
+    ----------
+    stations : sequence or dict
+        Locations as ``(longitude, latitude)`` in degrees, optionally by station
+        name. Values of a dict may also be station datasets with a single latitude
+        and longitude.
+
+    Returns
+    -------
+    names : list or None
+        Names of the stations if given.
+    points : numpy.ndarray
+        Longitudes and latitudes of the stations with shape ``(n, 2)``.
+
+    """
+    if isinstance(stations, dict):
+        names: Optional[List[Any]] = list(stations.keys())
+        values: Any = [
+            (s["longitude"].values.item(), s["latitude"].values.item())
+            if hasattr(s, "data_vars")
+            else s
+            for s in stations.values()
+        ]
+    else:
+        names, values = None, stations
+
+    return names, np.asarray(values, dtype=float).reshape(-1, 2)
+
+
+def interpolation_weights(
+    latitude: np.ndarray,
+    longitude: np.ndarray,
+    station_latitude: np.ndarray,
+    station_longitude: np.ndarray,
+    method: str = "bilinear",
+) -> Any:
+    """Shared weights of the grid points for values at stations.
+
+    Built once per grid, set of stations and method.
+
+    Parameters
+    ----------
+    latitude, longitude : array_like
+        Coordinates of the grid in degrees, 1-D for ``"bilinear"``.
+    station_latitude, station_longitude : array_like
+        Coordinates of the stations in degrees.
+    method : {"bilinear", "nearest"}, optional
+        Bilinear interpolation in latitude and longitude between the four
+        surrounding grid points, longitudes periodic on global grids, or the nearest
+        grid point on the sphere, defaults to ``"bilinear"``.
+
+    Returns
+    -------
+    scipy.sparse.csr_matrix
+        Weights with a row for each station and a column for each grid point in
+        C order, without entries for stations outside the grid.
+
+    """
+    if method not in ("bilinear", "nearest"):
+        raise ValueError(f"Unknown method {method}.")
+    arrays = [
+        np.ascontiguousarray(a, dtype=float)
+        for a in [latitude, longitude, station_latitude, station_longitude]
+    ]
+    if method == "bilinear" and (arrays[0].ndim != 1 or arrays[1].ndim != 1):
+        raise ValueError("Bilinear interpolation requires 1-D coordinates.")
+
+    return _cached_weights(method, *[(a.shape, a.tobytes()) for a in arrays])
+
+
+@lru_cache(maxsize=16)
+def _cached_weights(method: str, *arrays: Tuple[Tuple[int, ...], bytes]) -> Any:
+    from scipy import sparse
+
+    lat, lon, slat, slon = [np.frombuffer(b).reshape(shape) for shape, b in arrays]
+    if method == "nearest":
+        index = grid_index(lat, lon)
+        shape = index.shape
+        _, indices = index.query(slat, slon)
+        rows = np.arange(len(slat))
+        cols = np.ravel_multi_index(indices, shape)
+        weights = np.ones(len(slat))
+    else:
+        shape = (lat.size, lon.size)
+        i, wi = _bracket(lat, slat, periodic=False)
+        j, wj = _bracket(lon, slon, periodic=True)
+        rows = np.repeat(np.arange(len(slat)), 4)
+        cols = np.ravel_multi_index(
+            (np.repeat(i, 2, axis=1).ravel(), np.tile(j, 2).ravel()), shape
+        )
+        weights = (np.repeat(wi, 2, axis=1) * np.tile(wj, 2)).ravel()
+        inside = np.repeat(np.isfinite(wi[:, 0]) & np.isfinite(wj[:, 0]), 4)
+        rows, cols, weights = rows[inside], cols[inside], weights[inside]
+
+    return sparse.csr_matrix(
+        (weights, (rows, cols)), shape=(len(slat), int(np.prod(shape)))
+    )
+
+
+def _bracket(grid: np.ndarray, x: np.ndarray, periodic: bool) -> Tuple[Any, Any]:
+    """Indices of the grid points around `x` and their linear weights.
+
+    Returns arrays of shape ``(n, 2)``, with NaN weights for points outside the
+    grid. Longitudes are compared modulo 360 and, on grids spanning the globe,
+    interpolated across the end of the grid.
+
+    """
+    order = np.argsort(grid)
+    g = grid[order]
+    if periodic:
+        x = (x - g[0]) % 360 + g[0]
+        step = g[0] + 360 - g[-1]
+        periodic = len(g) > 1 and step <= np.max(np.diff(g)) * (1 + 1e-6)
+        if periodic:
+            g = np.append(g, g[0] + 360)
+            order = np.append(order, order[0])
+    k = np.clip(np.searchsorted(g, x, side="right") - 1, 0, max(len(g) - 2, 0))
+    if len(g) == 1:
+        w = np.where(x == g[0], 1.0, np.nan)
+        return np.stack([order[k], order[k]], axis=1), np.stack([w, 0 * w], axis=1)
+    w = (x - g[k]) / (g[k + 1] - g[k])
+    w = np.where((w >= 0) & (w <= 1), w, np.nan)
+
+    return np.stack([order[k], order[k + 1]], axis=1), np.stack([1 - w, w], axis=1)
@@ -0,0 +1,169 @@
+"""
+Tiled evaluation of stencils on the horizontal grid.
+"""
+
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import ExitStack
+from typing import Any, Callable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+
+Halo = Union[int, Tuple[int, int]]
+
+
+def map_tiles(
+    func: Callable[..., np.ndarray],
+    arrays: Sequence[Any],
+    coords: Tuple[np.ndarray, np.ndarray],
+    tile: Optional[Tuple[int, int]] = None,
+    halo: Halo = 1,
+    dtype: Any = None,
+    n_workers: Optional[int] = None,
+    executor: Optional[Executor] = None,
+    **kwargs: Any
+) -> Any:
+    """Evaluate stencil `func` on the two trailing axes of `arrays` tile by tile.
+
+    The grid is split into tiles, each extended by `halo` grid points on every side
+    that exists, so the stencil sees the same neighbours as on the whole grid. Only
+    the interior of each tile is kept, the result is identical to calling `func` on
+    the whole grid. NumPy arrays are processed tile after tile, in worker processes
+    if requested, with only one tile and its halo per call. Dask arrays stay lazy,
+    with one tile per chunk of the grid axes, which are not merged.
+
+    Parameters
+    ----------
+    func : callable
+        Stencil called as ``func(*tiles, y, x, **kwargs)`` with the tiles of
+        `arrays` and the coordinates of the tile along both axes. Returns an array
+        of the broadcast shape of the tiles.
+    arrays : list of array_like
+        NumPy or Dask arrays with the grid as their two trailing axes.
+    coords : tuple of numpy.ndarray
+        1-D coordinates of the grid along the two trailing axes.
+    tile : tuple of int, optional
+        Size of the tiles along both axes, defaults to the whole grid for NumPy
+        arrays and to the chunks of the first Dask array.
+    halo : int or tuple of int, optional
+        Grid points added on each side of a tile, along both axes or per axis,
+        defaults to 1 for stencils of nearest neighbours.
+    dtype : numpy.dtype, optional
+        Type of the result, required for Dask arrays.
+    n_workers : int, optional
+        Process NumPy tiles in this many worker processes.
+    executor : concurrent.futures.Executor, optional
+        Process NumPy tiles through this executor.
+    **kwargs
+        Passed on to `func`.
+
+    Returns
+    -------
+    array_like
+        Result of `func` on the whole grid, a Dask array for Dask inputs.
+
+    """
+    halos = (halo, halo) if isinstance(halo, int) else (halo[0], halo[1])
+    if any(_is_dask(a) for a in arrays):
+        return _map_overlap(func, arrays, coords, tile, halos, dtype, kwargs)
+
+    ny, nx = len(coords[0]), len(coords[1])
+    if tile is None:
+        tile = (ny, nx)
+    tiles = [
+        (slice(i, min(i + tile[0], ny)), slice(j, min(j + tile[1], nx)))
+        for i in range(0, ny, tile[0])
+        for j in range(0, nx, tile[1])
+    ]
+    if len(tiles) == 1:
+        return func(*arrays, *coords, **kwargs)
+
+    extended = [_extend(t, (ny, nx), halos) for t in tiles]
+    tasks = [
+        ([a[..., ey, ex] for a in arrays], (coords[0][ey], coords[1][ex]))
+        for ey, ex in extended
+    ]
+    with ExitStack() as stack:
+        if executor is None and n_workers is not None:
+            executor = stack.enter_context(ProcessPoolExecutor(n_workers))
+        if executor is None:
+            results: Any = (func(*a, *c, **kwargs) for a, c in tasks)
+        else:
+            futures = [executor.submit(func, *a, *c, **kwargs) for a, c in tasks]
+            results = (f.result() for f in futures)
+        out = None
+        for (ty, tx), (ey, ex), r in zip(tiles, extended, results):
+            if out is None:
+                shape = np.broadcast_shapes(*[np.shape(a)[:-2] for a in arrays])
+                out = np.empty(shape + (ny, nx), dtype=r.dtype)
+            iy = slice(ty.start - ey.start, ty.stop - ey.start)
+            ix = slice(tx.start - ex.start, tx.stop - ex.start)
+            out[..., ty, tx] = r[..., iy, ix]
+
+    return out
+
+
+def _is_dask(a: Any) -> bool:
+    return type(a).__module__.split(".")[0] == "dask"
+
+
+def _extend(
+    t: Tuple[slice, slice], shape: Tuple[int, int], halo: Tuple[int, int]
+) -> Tuple[slice, slice]:
+    """Slices of tile `t` extended by `halo`, limited to the grid."""
+    return tuple(  # type: ignore
+        slice(max(s.start - h, 0), min(s.stop + h, n))
+        for s, n, h in zip(t, shape, halo)
+    )
+
+
+def _map_overlap(
+    func: Callable[..., np.ndarray],
+    arrays: Sequence[Any],
+    coords: Tuple[np.ndarray, np.ndarray],
+    tile: Optional[Tuple[int, int]],
+    halo: Tuple[int, int],
+    dtype: Any,
+    kwargs: Any,
+) -> Any:
+    """Lazy :func:`map_tiles` of Dask arrays with :func:`dask.array.map_overlap`."""
+    import dask.array
+
+    if dtype is None:
+        raise ValueError("The dtype of the result is required for Dask arrays.")
+    shape = np.broadcast_shapes(*[np.shape(a) for a in arrays])
+    first = dask.array.broadcast_to(next(a for a in arrays if _is_dask(a)), shape)
+    chunks = first.chunks[:-2] + (first.chunks[-2:] if tile is None else tile)
+    arrays = [
+        dask.array.broadcast_to(dask.array.asarray(a), shape).rechunk(chunks)
+        for a in arrays
+    ]
+    chunks = arrays[0].chunks
+    y = dask.array.from_array(coords[0][:, np.newaxis], chunks=(chunks[-2], 1))
+    x = dask.array.from_array(coords[1][np.newaxis, :], chunks=(1, chunks[-1]))
+    n = len(shape)
+    depth: List[Any] = [{n - 2: halo[0], n - 1: halo[1]}] * len(arrays)
+    depth += [{0: halo[0], 1: 0}, {0: 0, 1: halo[1]}]
+
+    return dask.array.map_overlap(
+        _block,
+        *arrays,
+        y,
+        x,
+        depth=depth,
+        boundary="none",
+        align_arrays=False,
+        dtype=dtype,
+        meta=np.empty((0,) * n, dtype=dtype),
+        stencil=func,
+        **kwargs
+    )
+
+
+def _block(
+    *blocks: np.ndarray, stencil: Callable[..., np.ndarray], **kwargs: Any
+) -> np.ndarray:
+    """Call `stencil` on a block with the coordinates passed as 2-D blocks."""
+    *arrays, y, x = blocks
+
+    return stencil(*arrays, y[:, 0], x[0, :], **kwargs)
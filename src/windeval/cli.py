@@ -0,0 +1,367 @@
+"""
+Command line batch processing of wind products.
+
+The ``windeval`` command computes derived variables of a product in blocks of time
+steps, in worker processes if requested, and saves them block by block, so memory
+stays bounded by the block size whatever the length of the product::
+
+    windeval "era5/*.nc" -o derived \\
+        --vars surface_downward_eastward_stress,sverdrup_transport \\
+        --drag-coefficient large_and_pond_1981 --workers 4
+"""
+
+import argparse
+import multiprocessing
+import shutil
+import sys
+import time
+
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+
+_MEMORY = 256
+"""Default memory budget of a block in MiB."""
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Run the ``windeval`` command with arguments `argv`, defaults to the command line.
+
+    Returns
+    -------
+    int
+        Exit status.
+
+    """
+    parser = _parser()
+    args = parser.parse_args(argv)
+    variables = [v.strip() for v in args.vars.split(",") if v.strip()]
+    try:
+        path = batch(
+            args.inputs,
+            args.output,
+            variables,
+            name=args.name,
+            drag_coefficient=args.drag_coefficient,
+            bulk_formula=args.bulk_formula,
+            extend_ranges=args.extend_ranges,
+            dtype=args.dtype,
+            block_size=args.block_size,
+            memory=args.memory * 2 ** 20,
+            n_workers=args.workers,
+            target=args.target,
+            complevel=args.complevel,
+            incremental=args.incremental,
+            progress=None if args.quiet else _print,
+        )
+    except (ValueError, FileNotFoundError) as e:
+        parser.error(str(e))
+    if not args.quiet:
+        _print(f"saved {path}")
+
+    return 0
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="windeval",
+        description="Compute derived variables of a wind product and save them.",
+    )
+    parser.add_argument(
+        "inputs", nargs="+", help="files or glob patterns of the wind product"
+    )
+    parser.add_argument(
+        "-o", "--output", required=True, help="directory to save the result in"
+    )
+    parser.add_argument(
+        "--vars",
+        required=True,
+        help="comma separated names of derived variables, e.g. "
+        "surface_downward_eastward_stress,sverdrup_transport",
+    )
+    parser.add_argument(
+        "--name", help="name of the saved product, defaults to the input name"
+    )
+    parser.add_argument("--drag-coefficient", help="name of the drag coefficient")
+    parser.add_argument("--bulk-formula", help="name of the bulk formula")
+    parser.add_argument(
+        "--extend-ranges",
+        action="store_true",
+        default=None,
+        help="fill undefined ranges of the drag coefficients",
+    )
+    parser.add_argument("--dtype", help="floating point type, e.g. float32")
+    parser.add_argument(
+        "--block-size", type=int, help="time steps per block, defaults to --memory"
+    )
+    parser.add_argument(
+        "--memory",
+        type=int,
+        default=_MEMORY,
+        help=f"memory budget of a block in MiB, defaults to {_MEMORY}",
+    )
+    parser.add_argument("-j", "--workers", type=int, help="number of worker processes")
+    parser.add_argument(
+        "--target", choices=["netcdf", "zarr"], default="netcdf", help="file format"
+    )
+    parser.add_argument("--complevel", type=int, help="netCDF compression level")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only process and append time steps missing in an existing output",
+    )
+    parser.add_argument(
+        "-q", "--quiet", action="store_true", help="do not report progress"
+    )
+
+    return parser
+
+
+def _print(message: str) -> None:
+    print(message, file=sys.stderr, flush=True)
+
+
+def batch(
+    inputs: Sequence[str],
+    output: str,
+    variables: Sequence[str],
+    name: Optional[str] = None,
+    drag_coefficient: Optional[str] = None,
+    bulk_formula: Optional[str] = None,
+    extend_ranges: Optional[bool] = None,
+    dtype: Any = None,
+    block_size: Optional[int] = None,
+    memory: int = _MEMORY * 2 ** 20,
+    n_workers: Optional[int] = None,
+    target: str = "netcdf",
+    complevel: Optional[int] = None,
+    incremental: bool = False,
+    progress: Optional[Callable[[str], None]] = None,
+) -> Path:
+    """Compute derived variables of a product block by block and save them.
+
+    The product is read, processed with :func:`windeval.processing.compute` and
+    saved in blocks of time steps, which worker processes read and process
+    concurrently while the blocks are appended to the output in order.
+
+    Parameters
+    ----------
+    inputs : list of str
+        Files or glob patterns of the wind product, combined by their coordinates.
+    output : str
+        Directory to save the derived variables in, see
+        :func:`windeval.io.save_product`. An existing file of the product is
+        replaced, unless `incremental`.
+    variables : list of str
+        Names of derived variables, see
+        :data:`windeval.processing.DERIVED_VARIABLES`.
+    name : str, optional
+        Name of the saved product, defaults to the name of the inputs.
+    drag_coefficient, bulk_formula, extend_ranges, dtype : optional
+        Passed on to :func:`windeval.processing.compute`.
+    block_size : int, optional
+        Number of time steps of a block, defaults to as many as fit into `memory`.
+    memory : int, optional
+        Estimated memory of a block in bytes, with its inputs, intermediate and
+        derived variables, defaults to 256 MiB.
+    n_workers : int, optional
+        Process blocks in this many worker processes, defaults to processing them
+        one after another in this process.
+    target : {"netcdf", "zarr"}, optional
+        Format of the saved product, defaults to netCDF.
+    complevel : int, optional
+        Compression level of netCDF variables, defaults to no compression.
+    incremental : bool, optional
+        Only process the time steps of the inputs that are missing at the end of an
+        existing output and append them, defaults to `False`. The derived variables
+        are calculated per time step, so no overlap with processed steps is needed.
+        The output records its complete time steps after each block, a rerun after
+        an interrupted append overwrites the incomplete block.
+    progress : callable, optional
+        Called with a line of progress and throughput after each block.
+
+    Returns
+    -------
+    pathlib.Path
+        Path of the saved product.
+
+    """
+    import numpy as np
+
+    from . import processing
+    from .io.products import _commit, _committed, _files, _name, _save
+
+    if target not in ("netcdf", "zarr"):
+        raise ValueError(f"Unknown target {target}.")
+    files = tuple(f for p in inputs for f in _files(p))
+    kwargs = {
+        k: v
+        for k, v in [
+            ("drag_coefficient", drag_coefficient),
+            ("bulk_formula", bulk_formula),
+            ("extend_ranges", extend_ranges),
+            ("dtype", dtype),
+        ]
+        if v is not None
+    }
+    for method in (drag_coefficient, bulk_formula):
+        if method is not None and not hasattr(processing.BulkFormula, method.lower()):
+            raise ValueError(f"Unknown drag coefficient or bulk formula {method}.")
+    X = _product(files)
+    graph = processing._plan(X, variables, drag_coefficient)
+    needed = _needed(X, graph, drag_coefficient)
+    nt = X.sizes.get("time", 1)
+    append_dim = "time" if "time" in X.dims else None
+    name = name or _name(inputs[0] if len(inputs) == 1 else files)
+    path = Path(output)
+    path.mkdir(parents=True, exist_ok=True)
+    store = path.joinpath(name + (".zarr" if target == "zarr" else ".cdf"))
+    first = offset = 0
+    if incremental and append_dim is not None and store.exists():
+        offset, done = _committed(store, append_dim)
+        new = np.flatnonzero(~np.isin(X[append_dim].values, done))
+        if (new != np.arange(nt - new.size, nt)).any():
+            raise ValueError(
+                f"Time steps of the inputs missing in {store} are not at the end."
+            )
+        first = nt - new.size
+    elif store.is_dir():
+        shutil.rmtree(store)
+    elif store.exists():
+        store.unlink()
+
+    step = _step_nbytes(X, needed, len(graph) + len(variables))
+    if block_size is None:
+        block_size = max(1, min(nt, memory // max(step, 1)))
+    blocks = [(a, min(a + block_size, nt)) for a in range(first, nt, block_size)]
+    nbytes = sum(X[v].nbytes for v in needed) // nt
+
+    start = time.perf_counter()
+    for i, Y in enumerate(
+        _blocks(files, blocks, variables, needed, kwargs, n_workers), 1
+    ):
+        _save(
+            name,
+            Y,
+            str(path),
+            target,
+            append_dim=append_dim,
+            start=offset,
+            complevel=complevel,
+        )
+        if append_dim is not None:
+            offset += Y.sizes[append_dim]
+            _commit(store, offset)
+        if progress is not None:
+            progress(_progress(i, blocks, nbytes, time.perf_counter() - start))
+    if progress is not None and not blocks:
+        progress(f"no new time steps in {store}")
+
+    return store
+
+
+@lru_cache(maxsize=1)
+def _product(files: Tuple[str, ...]) -> Any:
+    """Product of `files`, opened once per process and read on first access."""
+    from .io.products import _open
+
+    return _open(files[0] if len(files) == 1 else list(files), None, False)
+
+
+def _needed(
+    X: Any, graph: Dict[str, Any], drag_coefficient: Optional[str]
+) -> List[str]:
+    """Variables of `X` the derived variables in `graph` are calculated from."""
+    from .processing import DERIVED_VARIABLES, BulkFormula
+
+    inputs = {i for v in graph for i in DERIVED_VARIABLES[v][1]}
+    inputs.update(BulkFormula._inputs.get(drag_coefficient or "", ()))
+
+    return [str(v) for v in X.data_vars if v in inputs]
+
+
+def _step_nbytes(X: Any, needed: List[str], n_derived: int) -> int:
+    """Estimated bytes per time step of the inputs and derived variables."""
+    grid = 1
+    nbytes = 0
+    for v in needed:
+        var = X[v]
+        size = var.size // var.sizes.get("time", 1)
+        grid = max(grid, size)
+        nbytes += size * var.dtype.itemsize
+    # derived variables and their temporaries in float64
+    return nbytes + 2 * n_derived * grid * 8
+
+
+def _blocks(
+    files: Tuple[str, ...],
+    blocks: List[Tuple[int, int]],
+    variables: Sequence[str],
+    needed: List[str],
+    kwargs: Dict[str, Any],
+    n_workers: Optional[int],
+) -> Any:
+    """Derived variables of the blocks in order, computed in worker processes.
+
+    At most two blocks per worker are in flight, so memory stays bounded when
+    saving is slower than processing.
+
+    """
+    args = (files, variables, needed, kwargs)
+    if n_workers is None:
+        for block in blocks:
+            yield _block(block, *args)
+        return
+
+    # workers read the files themselves and must not inherit locks of HDF5 or Dask
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(n_workers, mp_context=context) as executor:
+        pending: Dict[int, Future] = {}
+        todo = iter(enumerate(blocks))
+        for i in range(len(blocks)):
+            for j, block in todo:
+                pending[j] = executor.submit(_block, block, *args)
+                if len(pending) >= 2 * n_workers:
+                    break
+            while not pending[i].done():
+                wait(pending.values(), return_when=FIRST_COMPLETED)
+            yield pending.pop(i).result()
+
+
+def _block(
+    block: Tuple[int, int],
+    files: Tuple[str, ...],
+    variables: Sequence[str],
+    needed: List[str],
+    kwargs: Dict[str, Any],
+) -> Any:
+    """Derived variables of the time steps of `block`."""
+    from .instrumentation import sizes, stage
+    from .processing import compute
+
+    X = _product(files)[needed]
+    with stage("cli.block", start=block[0], stop=block[1]) as r:
+        if "time" in X.dims:
+            X = X.isel(time=slice(*block))
+        Y = compute(X.load(), variables, **kwargs)[list(variables)]
+        sizes(r, Y)
+
+    return Y
+
+
+def _progress(
+    i: int, blocks: List[Tuple[int, int]], nbytes: int, elapsed: float
+) -> str:
+    """Progress after block `i` of `blocks`, with `nbytes` of inputs per time step."""
+    done = blocks[i - 1][1] - blocks[0][0]
+    total = blocks[-1][1] - blocks[0][0]
+    elapsed = max(elapsed, 1e-9)
+    rate = done / elapsed
+
+    return (
+        f"block {i}/{len(blocks)}: {done}/{total} time steps, {elapsed:.1f} s, "
+        f"{rate:.1f} steps/s, {nbytes * rate / 2 ** 20:.1f} MiB/s, "
+        f"eta {(total - done) / rate:.1f} s"
+    )
@@ -0,0 +1,124 @@
+"""
+Collocation of gridded wind products with stations.
+"""
+
+from typing import Any, Optional
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from ._spatial import Stations, interpolation_weights, station_points
+from .instrumentation import instrumented
+
+
+@instrumented("collocation.collocate")
+def collocate(
+    X: xr.Dataset,
+    stations: Stations,
+    method: str = "bilinear",
+    time: Optional[Any] = None,
+    time_method: str = "nearest",
+    tolerance: Optional[Any] = None,
+) -> xr.Dataset:
+    """Values of a gridded product at stations.
+
+    The weights of the grid points are computed once per grid, set of stations and
+    method and applied to all time steps at once as a sparse matrix product, lazily
+    for Dask arrays. Missing values, e.g. over land, are left out of the
+    interpolation and the weights of the remaining grid points renormalized.
+
+    Parameters
+    ----------
+    X : xarray.Dataset
+        Gridded wind product with coordinates ``latitude`` and ``longitude``.
+    stations : sequence or dict
+        Locations as ``(longitude, latitude)`` in degrees, optionally by station
+        name. Values of a dict may also be station datasets, e.g. of moored buoys,
+        with a single latitude and longitude.
+    method : {"bilinear", "nearest"}, optional
+        Bilinear interpolation between the four surrounding grid points, which
+        requires 1-D coordinates, or the nearest grid point, defaults to
+        ``"bilinear"``.
+    time : array_like, optional
+        Times to match, e.g. of the station observations, defaults to the times of
+        `X`.
+    time_method : {"nearest", "linear"}, optional
+        Take the nearest time step of `X` or interpolate linearly between time
+        steps, defaults to ``"nearest"``.
+    tolerance : optional
+        Largest distance to the nearest time step, e.g. ``"30min"``, beyond which
+        values are missing, defaults to no limit.
+
+    Returns
+    -------
+    xarray.Dataset
+        Variables of `X` along a dimension ``station`` instead of the grid, with
+        the coordinates of the stations.
+
+    """
+    if time_method not in ("nearest", "linear"):
+        raise ValueError(f"Unknown time_method {time_method}.")
+    names, points = station_points(stations)
+    lat, lon = X.latitude, X.longitude
+    dims = ["latitude", "longitude"] if lat.ndim == 1 else list(lat.dims)
+    weights = interpolation_weights(
+        lat.values, lon.values, points[:, 1], points[:, 0], method
+    )
+
+    if time is not None and time_method == "nearest":
+        index = X.indexes["time"]
+        times = pd.Index(np.atleast_1d(time))
+        if tolerance is not None and np.issubdtype(index.dtype, np.datetime64):
+            tolerance = pd.Timedelta(tolerance)
+        i = index.get_indexer(times, method="nearest", tolerance=tolerance)
+        X = X.isel(time=np.maximum(i, 0)).assign_coords(time=times)
+        if (i < 0).any():
+            X = X.where(xr.DataArray(i >= 0, dims="time", coords={"time": times}))
+
+    Y = xr.Dataset(attrs=X.attrs)
+    for name, var in X.data_vars.items():
+        if not set(dims) <= set(var.dims):
+            Y[name] = var
+            continue
+        Y[name] = xr.apply_ufunc(
+            _apply,
+            var,
+            input_core_dims=[dims],
+            output_core_dims=[["station"]],
+            kwargs={"weights": weights},
+            dask="parallelized",
+            output_dtypes=[np.result_type(var.dtype, np.float32)],
+            dask_gufunc_kwargs={"output_sizes": {"station": len(points)}},
+            keep_attrs=True,
+        )
+    Y = Y.assign_coords(
+        station_longitude=("station", points[:, 0]),
+        station_latitude=("station", points[:, 1]),
+    )
+    if names is not None:
+        Y = Y.assign_coords(station=names)
+
+    if time is not None and time_method == "linear":
+        Y = Y.interp(time=np.atleast_1d(time))
+
+    return Y
+
+
+def _apply(values: np.ndarray, weights: Any) -> np.ndarray:
+    """Weighted sums over the last two axes of `values`, skipping missing values."""
+    shape = values.shape[: values.ndim - 2]
+    dtype = np.result_type(values.dtype, np.float32)
+    flat = values.reshape(-1, weights.shape[1]).astype(dtype, copy=False)
+    weights = weights.astype(dtype)
+    valid = np.isfinite(flat)
+    if valid.all():
+        total = np.asarray(weights.sum(axis=1)).T
+        result = weights.dot(flat.T).T
+    else:
+        total = weights.dot(valid.T.astype(dtype)).T
+        result = weights.dot(np.where(valid, flat, 0).T).T
+    with np.errstate(invalid="ignore", divide="ignore"):
+        result = np.where(total > 0, result / total, np.nan).astype(dtype, copy=False)
+
+    return result.reshape(shape + (weights.shape[0],))
@@ -0,0 +1,250 @@
+"""
+Timing and memory instrumentation of processing and IO.
+
+Inside :func:`instrument` every instrumented step, e.g. a processing function, the
+evaluation of a drag coefficient, the assignment of a result to its dataset or the
+opening and saving of a product, produces a record like::
+
+    {"stage": "processing.sverdrup_transport", "wall": 0.12, "cpu": 0.11,
+     "depth": 0, "nbytes": 87091200, "shape": [168, 180, 360], ...}
+
+which is passed to the sinks given to :func:`instrument`. With ``memory=True`` the
+records also contain the bytes allocated (``allocated``) and the peak of the
+allocations (``peak``) during the step as traced by :mod:`tracemalloc`. Memory and
+CPU time are measured for the whole process. Steps run in worker processes, e.g.
+by ``n_workers``, are not recorded.
+
+Without an active :func:`instrument` each step costs one check of an empty list.
+
+"""
+
+import json
+import logging
+import threading
+import time
+import tracemalloc
+
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import PurePath
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional, TypeVar, Union
+
+
+Record = Dict[str, Any]
+Sink = Callable[[Record], None]
+
+_SINKS: List[Sink] = []
+"""Sinks of the active :func:`instrument` contexts, empty if instrumentation is off."""
+
+_MEMORY = [0]
+"""Number of active :func:`instrument` contexts tracing memory."""
+
+_LOCK = threading.Lock()
+_LOCAL = threading.local()
+
+
+@contextmanager
+def instrument(
+    *sinks: Union[Sink, str, PurePath, IO[str], logging.Logger], memory: bool = False
+) -> Iterator[List[Record]]:
+    """Record timing and memory of the instrumented steps run inside the context.
+
+    Parameters
+    ----------
+    *sinks : callable, str, path, file or logging.Logger
+        Receivers of each record: functions called with the record, paths or open
+        text files to append the records to as JSON lines, or loggers to log them
+        to at debug level.
+    memory : bool, optional
+        Trace allocations with :mod:`tracemalloc`, which slows down many small
+        allocations considerably, defaults to `False`.
+
+    Yields
+    ------
+    list of dict
+        All records of the context, in the order the steps finished.
+
+    Examples
+    --------
+    >>> with instrument("profile.jsonl") as records:  # doctest: +SKIP
+    ...     processing.sverdrup_transport(X)
+    >>> [r["stage"] for r in records]  # doctest: +SKIP
+    ['processing.surface_downward_eastward_stress', ...]
+
+    """
+    records: List[Record] = []
+    callbacks: List[Sink] = [records.append]
+    files: List[IO[str]] = []
+    for sink in sinks:
+        if isinstance(sink, (str, PurePath)):
+            files.append(open(sink, "a"))
+            callbacks.append(_json_lines(files[-1]))
+        elif isinstance(sink, logging.Logger):
+            callbacks.append(_log(sink))
+        elif callable(sink):
+            callbacks.append(sink)
+        else:
+            callbacks.append(_json_lines(sink))
+
+    def emit(record: Record) -> None:
+        for c in callbacks:
+            c(record)
+
+    started = False
+    with _LOCK:
+        if memory:
+            _MEMORY[0] += 1
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started = True
+        _SINKS.append(emit)
+    try:
+        yield records
+    finally:
+        with _LOCK:
+            _SINKS.remove(emit)
+            if memory:
+                _MEMORY[0] -= 1
+            if started:
+                tracemalloc.stop()
+        for f in files:
+            f.close()
+
+
+def _json_lines(f: IO[str]) -> Sink:
+    lock = threading.Lock()
+
+    def write(record: Record) -> None:
+        line = json.dumps(record, default=str)
+        with lock:
+            f.write(line + "\n")
+            f.flush()
+
+    return write
+
+
+def _log(logger: logging.Logger) -> Sink:
+    def log(record: Record) -> None:
+        logger.debug(
+            "%s %.6f s", record["stage"], record["wall"], extra={"windeval": record}
+        )
+
+    return log
+
+
+class _Discard(dict):
+    """Record of a step that is not instrumented, forgets what is written to it."""
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        pass
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        pass
+
+
+class _Null:
+    record = _Discard()
+
+    def __enter__(self) -> Record:
+        return self.record
+
+    def __exit__(self, *args: Any) -> None:
+        return None
+
+
+_NULL = _Null()
+
+
+class _Stage:
+    def __init__(self, name: str, info: Record):
+        self.record = {"stage": name, **info}
+
+    def __enter__(self) -> Record:
+        self.memory = _MEMORY[0] > 0 and tracemalloc.is_tracing()
+        if self.memory:
+            self.current, peak = tracemalloc.get_traced_memory()
+            _reset_peak(peak)
+            self.peak = 0
+        stack = _LOCAL.__dict__.setdefault("stack", [])
+        self.record["depth"] = len(stack)
+        stack.append(self)
+        self.cpu = time.process_time()
+        self.wall = time.perf_counter()
+
+        return self.record
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        wall = time.perf_counter() - self.wall
+        cpu = time.process_time() - self.cpu
+        r = self.record
+        r.update(wall=wall, cpu=cpu, time=time.time() - wall)
+        if exc_type is not None:
+            r["error"] = exc_type.__name__
+        _LOCAL.stack.pop()
+        if self.memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            peak = max(self.peak, peak)
+            r["allocated"] = current - self.current
+            r["peak"] = peak - self.current
+            _reset_peak(peak)
+        for emit in list(_SINKS):
+            emit(r)
+
+
+def _reset_peak(peak: int) -> None:
+    """Pass the peak of the traced memory to the enclosing steps and reset it."""
+    for s in getattr(_LOCAL, "stack", []):
+        if getattr(s, "memory", False):
+            s.peak = max(s.peak, peak)
+    if hasattr(tracemalloc, "reset_peak"):
+        tracemalloc.reset_peak()
+
+
+def stage(name: str, **info: Any) -> Any:
+    """Context of an instrumented step named `name`.
+
+    The context yields the record of the step, entries added to it, e.g. array
+    sizes, are passed on to the sinks. `info` is added to the record as well.
+
+    """
+    if not _SINKS:
+        return _NULL
+
+    return _Stage(name, info)
+
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def instrumented(name: str, output: Optional[str] = None) -> Callable[[F], F]:
+    """Decorator recording calls of a function as step `name`.
+
+    Sizes are recorded of the variable `output` of the returned dataset or, without
+    `output`, of the returned array.
+
+    """
+
+    def decorator(func: F) -> F:
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not _SINKS:
+                return func(*args, **kwargs)
+            with _Stage(name, {}) as record:
+                result = func(*args, **kwargs)
+                sizes(record, result if output is None else result[output])
+
+            return result
+
+        return wrapper  # type: ignore
+
+    return decorator
+
+
+def sizes(record: Record, data: Any) -> None:
+    """Add the size in bytes and the shape of `data` to `record`."""
+    if hasattr(data, "nbytes"):
+        record["nbytes"] = int(data.nbytes)
+    if hasattr(data, "shape"):
+        record["shape"] = list(data.shape)
+    elif hasattr(data, "sizes"):
+        record["sizes"] = dict(data.sizes)
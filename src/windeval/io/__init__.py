@@ -0,0 +1,12 @@
+from importlib import import_module
+from typing import Any
+
+
+def __getattr__(name: str) -> Any:
+    # ``windeval.io`` is this package instead of :mod:`windeval.io.api` if one of
+    # its submodules is imported first, so the names of the api are forwarded.
+    api = import_module(".api", __name__)
+    if name == "api" or not hasattr(api, name):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    return getattr(api, name)
@@ -4,5 +4,6 @@ Data IO api.
 
 # flake8: noqa
 
+from .catalog import Catalog
 from .products import info, open_product, save_product, select
 from .reports import report
@@ -0,0 +1,461 @@
+"""
+Local catalog of wind product files.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import warnings
+
+from contextlib import closing
+from pathlib import PurePath
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+import xarray as xr
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    name TEXT PRIMARY KEY,
+    paths TEXT NOT NULL,
+    options TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    product TEXT NOT NULL REFERENCES products (name) ON DELETE CASCADE,
+    path TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    metadata TEXT NOT NULL,
+    PRIMARY KEY (product, path)
+);
+CREATE TABLE IF NOT EXISTS coordinates (
+    product TEXT NOT NULL REFERENCES products (name) ON DELETE CASCADE,
+    key TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (product, key)
+);
+"""
+
+
+class Catalog:
+    """Index of the files, variables and coordinates of wind products.
+
+    The catalog is a SQLite database that records for each file of a product its
+    variables with dimensions, data types, attributes and chunking on disk, and the
+    values of its coordinates, stored once per product if they are the same in
+    several files. Products are opened from the catalog without reading the files
+    until their data is needed, and :func:`windeval.io.info` describes them without
+    opening the files at all.
+
+    Parameters
+    ----------
+    path : str or path
+        File of the catalog, created if missing.
+
+    Examples
+    --------
+    >>> catalog = Catalog("products.sqlite")  # doctest: +SKIP
+    >>> catalog.add("era5", "/data/era5/*.nc")  # doctest: +SKIP
+    >>> wnddict = open_product(  # doctest: +SKIP
+    ...     "era5", "ncep", experimental=True, catalog=catalog
+    ... )
+
+    """
+
+    def __init__(self, path: Union[str, PurePath]):
+        self.path = str(path)
+        with closing(self._connect()) as con, con:
+            con.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        con = sqlite3.connect(self.path)
+        con.execute("PRAGMA foreign_keys = ON")
+
+        return con
+
+    def __contains__(self, name: object) -> bool:
+        return isinstance(name, str) and name in self.products()
+
+    def products(self) -> List[str]:
+        """Names of the products in the catalog."""
+        with closing(self._connect()) as con:
+            rows = con.execute("SELECT name FROM products ORDER BY name").fetchall()
+
+        return [r[0] for r in rows]
+
+    def add(self, name: str, path: Union[str, Sequence[str]], **kwargs: Any) -> int:
+        """Add or replace product `name` and index its files.
+
+        Parameters
+        ----------
+        name : str
+            Name of the product.
+        path : str or list of str
+            Path, glob pattern or list of paths of the product files. Glob patterns
+            are evaluated again by :meth:`update`, so new files are found.
+        **kwargs
+            Passed on to :func:`xarray.open_dataset` when the files are indexed and
+            read.
+
+        Returns
+        -------
+        int
+            Number of files indexed.
+
+        """
+        paths = path if isinstance(path, (str, PurePath)) else list(path)
+        with closing(self._connect()) as con, con:
+            con.execute("DELETE FROM products WHERE name = ?", (name,))
+            con.execute(
+                "INSERT INTO products VALUES (?, ?, ?)",
+                (name, json.dumps(paths, default=str), json.dumps(kwargs)),
+            )
+
+        return self.update(name)[name]
+
+    def remove(self, name: str) -> None:
+        """Remove product `name` from the catalog."""
+        with closing(self._connect()) as con, con:
+            con.execute("DELETE FROM products WHERE name = ?", (name,))
+
+    def update(self, *names: str) -> Dict[str, int]:
+        """Index new and modified files of products and forget removed ones.
+
+        Files are indexed again only if their size or modification time changed. A
+        product whose glob pattern matches no files any more keeps no files, with a
+        warning, and the other products are still updated.
+
+        Parameters
+        ----------
+        *names : str, optional
+            Names of the products to update, defaults to all.
+
+        Returns
+        -------
+        dict
+            Number of files indexed by product name.
+
+        """
+        from .products import _files
+
+        indexed = {}
+        for name in names or self.products():
+            paths, options = self._product(name)
+            with closing(self._connect()) as con:
+                known = {
+                    path: (mtime_ns, size)
+                    for path, mtime_ns, size in con.execute(
+                        "SELECT path, mtime_ns, size FROM files WHERE product = ?",
+                        (name,),
+                    )
+                }
+            try:
+                files = [os.path.abspath(f) for f in _files(paths)]
+            except FileNotFoundError as e:
+                warnings.warn(f"{e} Product {name} has no files.")
+                files = []
+            rows = []
+            coordinates = {}
+            for f in files:
+                s = os.stat(f)
+                if known.get(f) != (s.st_mtime_ns, s.st_size):
+                    metadata = _metadata(f, options)
+                    coordinates.update(_split_values(metadata))
+                    rows.append(
+                        (name, f, s.st_mtime_ns, s.st_size, json.dumps(metadata))
+                    )
+            removed = [(name, f) for f in known.keys() - set(files)]
+            with closing(self._connect()) as con, con:
+                con.executemany(
+                    "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)", rows
+                )
+                con.executemany(
+                    "DELETE FROM files WHERE product = ? AND path = ?", removed
+                )
+                con.executemany(
+                    "INSERT OR IGNORE INTO coordinates VALUES (?, ?, ?)",
+                    [(name, k, data) for k, data in coordinates.items()],
+                )
+                used = {
+                    k
+                    for (m,) in con.execute(
+                        "SELECT metadata FROM files WHERE product = ?", (name,)
+                    )
+                    for k in _value_keys(json.loads(m))
+                }
+                con.executemany(
+                    "DELETE FROM coordinates WHERE product = ? AND key = ?",
+                    [
+                        (name, k)
+                        for (k,) in con.execute(
+                            "SELECT key FROM coordinates WHERE product = ?", (name,)
+                        ).fetchall()
+                        if k not in used
+                    ],
+                )
+            indexed[name] = len(rows)
+
+        return indexed
+
+    def _product(self, name: str) -> Any:
+        with closing(self._connect()) as con:
+            row = con.execute(
+                "SELECT paths, options FROM products WHERE name = ?", (name,)
+            ).fetchone()
+        if row is None:
+            raise KeyError(f"No product {name} in catalog {self.path}.")
+
+        return json.loads(row[0]), json.loads(row[1])
+
+    def files(self, name: str) -> List[Dict[str, Any]]:
+        """Indexed files of product `name` with their size and metadata.
+
+        Coordinate values that are the same in several files are decoded once and
+        shared by their metadata.
+
+        """
+        self._product(name)
+        with closing(self._connect()) as con:
+            rows = con.execute(
+                "SELECT path, mtime_ns, size, metadata FROM files "
+                "WHERE product = ? ORDER BY path",
+                (name,),
+            ).fetchall()
+            stored = dict(
+                con.execute(
+                    "SELECT key, data FROM coordinates WHERE product = ?", (name,)
+                ).fetchall()
+            )
+        decoded: Dict[str, Any] = {}
+        files = []
+        for p, t, s, m in rows:
+            metadata = json.loads(m)
+            for v in metadata["variables"].values():
+                key = v.get("values")
+                if isinstance(key, str):
+                    if key not in decoded:
+                        decoded[key] = json.loads(stored[key])
+                    v["values"] = decoded[key]
+            files.append({"path": p, "mtime_ns": t, "size": s, "metadata": metadata})
+
+        return files
+
+    def open(
+        self, name: str, chunks: Optional[Union[int, Dict[str, int]]] = None
+    ) -> xr.Dataset:
+        """Open product `name` lazily from the catalog.
+
+        The dataset is built from the catalog alone, each variable of each file is a
+        Dask chunk that reads it when computed. Files modified since they were
+        indexed raise an error when read, see :meth:`update`.
+
+        Parameters
+        ----------
+        name : str
+            Name of the product.
+        chunks : int or dict, optional
+            Chunk sizes of the Dask arrays, defaults to one chunk per file.
+
+        Returns
+        -------
+        xarray.Dataset
+            Product with the variables of all its files combined by coordinates.
+
+        """
+        _, options = self._product(name)
+        files = self.files(name)
+        if not files:
+            raise FileNotFoundError(f"No files of product {name} in the catalog.")
+        dim = _concat_dim(files)
+        ds: Any
+        if dim is not None or len(files) == 1:
+            ds = _dataset(files, dim, options)
+        else:
+            ds = xr.combine_by_coords(
+                [_dataset([f], None, options) for f in files],
+                data_vars="minimal",
+                coords="minimal",
+                compat="override",
+            )
+        if chunks is not None:
+            ds = ds.chunk(chunks)
+
+        return ds
+
+
+def _metadata(path: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    """Attributes, variables and coordinate values of a file."""
+    with xr.open_dataset(path, cache=False, **options) as ds:
+        variables = {}
+        for name, var in ds.variables.items():
+            v = {
+                "dims": list(var.dims),
+                "shape": list(var.shape),
+                "dtype": var.dtype.str,
+                "attrs": _jsonable(var.attrs),
+                "chunksizes": _chunksizes(var.encoding),
+            }
+            if name in ds.coords:
+                v["values"] = _encode_values(var.values)
+            variables[str(name)] = v
+
+        return {"attrs": _jsonable(ds.attrs), "variables": variables}
+
+
+def _split_values(metadata: Dict[str, Any]) -> Dict[str, str]:
+    """Replace coordinate values in `metadata` by keys and return them by key."""
+    values = {}
+    for v in metadata["variables"].values():
+        if "values" in v:
+            data = json.dumps(v["values"])
+            v["values"] = hashlib.sha1(data.encode()).hexdigest()
+            values[v["values"]] = data
+
+    return values
+
+
+def _value_keys(metadata: Dict[str, Any]) -> Iterator[str]:
+    for v in metadata["variables"].values():
+        if isinstance(v.get("values"), str):
+            yield v["values"]
+
+
+def _chunksizes(encoding: Dict[str, Any]) -> Optional[List[int]]:
+    chunks = encoding.get("chunksizes", encoding.get("chunks"))
+
+    return None if chunks is None else [int(c) for c in chunks]
+
+
+def _jsonable(value: Any) -> Any:
+    """`value` with NumPy types replaced by their Python equivalents."""
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, (np.ndarray, np.generic)):
+        return _jsonable(value.tolist())
+    if isinstance(value, bytes):
+        return value.decode(errors="replace")
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+
+    return str(value)
+
+
+def _encode_values(values: np.ndarray) -> Any:
+    if values.dtype.kind in "mM":
+        return values.view(np.int64).tolist()
+    if values.dtype.kind in "OSU":
+        return [str(v) for v in values.ravel()]
+
+    return values.tolist()
+
+
+def _decode_values(v: Dict[str, Any]) -> np.ndarray:
+    dtype = np.dtype(v["dtype"])
+    if dtype.kind in "mM":
+        values = np.array(v["values"], dtype=np.int64).view(dtype)
+    elif dtype.kind == "O":
+        values = np.array(v["values"], dtype=object)
+    else:
+        values = np.array(v["values"], dtype=dtype)
+
+    return values.reshape(v["shape"])
+
+
+def _concat_dim(files: List[Dict[str, Any]]) -> Optional[str]:
+    """Dimension the files follow each other along, if it is the only difference.
+
+    Files are sorted along the dimension in place. Returns `None` for files that
+    differ otherwise, which are combined by :func:`xarray.combine_by_coords`.
+
+    """
+    first = files[0]["metadata"]["variables"]
+    dims = [
+        d
+        for d, v in first.items()
+        if v["dims"] == [d]
+        and any(f["metadata"]["variables"].get(d) != v for f in files)
+    ]
+    if len(dims) != 1:
+        return None
+    dim = dims[0]
+    for f in files:
+        variables = f["metadata"]["variables"]
+        if variables.keys() != first.keys():
+            return None
+        for name, v in variables.items():
+            w = first[name]
+            if v["dims"] != w["dims"] or v["dtype"] != w["dtype"]:
+                return None
+            if dim not in v["dims"] and v.get("values") != w.get("values"):
+                return None
+    files.sort(key=lambda f: f["metadata"]["variables"][dim]["values"][0])
+    values = [v for f in files for v in f["metadata"]["variables"][dim]["values"]]
+    if any(a >= b for a, b in zip(values, values[1:])):
+        return None
+
+    return dim
+
+
+def _dataset(
+    files: List[Dict[str, Any]], dim: Optional[str], options: Dict[str, Any]
+) -> xr.Dataset:
+    """Dataset of files following each other along `dim` with lazy data variables.
+
+    Variables along `dim` are concatenated, with one Dask chunk per file, the others
+    are taken from the first file.
+
+    """
+    import dask.array
+
+    from dask.base import tokenize
+
+    metadata = files[0]["metadata"]
+    coords: Dict[str, xr.Variable] = {}
+    data_vars: Dict[str, xr.Variable] = {}
+    for name, v in metadata["variables"].items():
+        parts = files if dim in v["dims"] else files[:1]
+        data: Any
+        if "values" in v:
+            data = np.concatenate(
+                [_decode_values(f["metadata"]["variables"][name]) for f in parts],
+                axis=v["dims"].index(dim) if dim in v["dims"] else 0,
+            )
+            target = coords
+        else:
+            key = "catalog-" + tokenize(
+                name, [(f["path"], f["mtime_ns"]) for f in parts], options
+            )
+            index = [0] * len(v["dims"])
+            graph = {}
+            for i, f in enumerate(parts):
+                if dim in v["dims"]:
+                    index[v["dims"].index(dim)] = i
+                graph[(key, *index)] = (_read, f["path"], name, f["mtime_ns"], options)
+            chunks = tuple(
+                tuple(f["metadata"]["variables"][name]["shape"][j] for f in parts)
+                if d == dim
+                else (n,)
+                for j, (d, n) in enumerate(zip(v["dims"], v["shape"]))
+            )
+            data = dask.array.Array(graph, key, chunks, dtype=np.dtype(v["dtype"]))
+            target = data_vars
+        var = xr.Variable(v["dims"], data, v["attrs"])
+        if v["chunksizes"] is not None:
+            var.encoding["chunksizes"] = tuple(v["chunksizes"])
+        target[name] = var
+
+    return xr.Dataset(data_vars, coords, metadata["attrs"])
+
+
+def _read(path: str, name: str, mtime_ns: int, options: Dict[str, Any]) -> Any:
+    """Values of variable `name` of a file, checking it is still as cataloged."""
+    if os.stat(path).st_mtime_ns != mtime_ns:
+        raise RuntimeError(
+            f"{path} changed since it was cataloged, update the catalog."
+        )
+    with xr.open_dataset(path, cache=False, **options) as ds:
+        return ds[name].values
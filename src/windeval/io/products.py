@@ -1,22 +1,87 @@
-from pathlib import Path
-from typing import Any, Dict
+import glob
+import os
 
+from concurrent.futures import Executor
+from pathlib import Path, PurePath
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
 import xarray as xr
 
+from .._parallel import map_products
+from .._spatial import grid_index, station_points
+from ..instrumentation import sizes, stage
+from .catalog import Catalog
+
 
 def open_product(
-    path0: str,
-    path1: str,
+    path0: Union[str, Sequence[str]],
+    path1: Union[str, Sequence[str]],
     *args: Any,
     experimental: bool = False,
+    chunks: Optional[Union[int, Dict[str, int]]] = None,
+    parallel: bool = True,
+    catalog: Optional[Union[str, PurePath, Catalog]] = None,
     **kwargs: Dict[str, Any]
 ) -> Dict[str, xr.Dataset]:
+    """Open two wind products.
+
+    A product is either a single file or many files, given as a glob pattern or a
+    list of paths, which are combined by their coordinates, usually along time.
+    Combined files are opened lazily as Dask arrays and only their metadata is read.
+    Products of a :class:`~windeval.io.catalog.Catalog` are opened by name from the
+    catalog without opening any file.
+
+    Parameters
+    ----------
+    path0, path1 : str or list of str
+        Path, glob pattern or list of paths of the wind product files, or name of a
+        product in `catalog`.
+    *args : str, optional
+        Names of the wind products, defaults to the file names without suffix or,
+        for several files, to the name of their common directory. Products with the
+        same default name are named after the common start of their file names.
+    experimental : bool, optional
+        Open files directly instead of through Intake, defaults to `False`.
+    chunks : int or dict, optional
+        Open the products lazily as Dask arrays with these chunk sizes, which keeps
+        all processing lazy until the results are computed or saved. Defaults to
+        reading the data eagerly for single files and to one chunk per file for
+        several files.
+    parallel : bool, optional
+        Open the metadata of several files in parallel with Dask, defaults to
+        `True`.
+    catalog : Catalog or str or path, optional
+        Catalog, or its file, to look up product names in.
+    **kwargs
+        Passed on to :func:`xarray.open_dataset` or :func:`xarray.open_mfdataset`.
+
+    Returns
+    -------
+    dict
+        Wind products by name.
+
+    """
+    paths = [path0, path1]
     if not args:
-        names = [Path(path0).stem, Path(path1).stem]
+        names = [_name(p) for p in paths]
+        if len(set(names)) < len(names):
+            names = [_stem(p) or n for p, n in zip(paths, names)]
     else:
         names = [*args]
+    if len(set(names)) < len(names):
+        raise ValueError(f"Products have the same name {names}, pass their names.")
+    if catalog is not None and not isinstance(catalog, Catalog):
+        catalog = Catalog(catalog)
     if experimental:
-        ds = {names[0]: xr.open_dataset(path0), names[1]: xr.open_dataset(path1)}
+        ds = {}
+        for name, path in zip(names, paths):
+            if catalog is not None and path in catalog:
+                with stage("io.open_product", path=str(path), catalog=True) as r:
+                    ds[name] = catalog.open(str(path), chunks)
+                    sizes(r, ds[name])
+            else:
+                ds[name] = _open(path, chunks, parallel, **kwargs)
     else:
         raise NotImplementedError(
             "Import of data through Intake is not yet implemented."
@@ -25,28 +90,564 @@ def open_product(
     return ds
 
 
+def _files(path: Union[str, Sequence[str]]) -> List[str]:
+    """Sorted files matching a glob pattern or a list of paths."""
+    if isinstance(path, (str, PurePath)):
+        if not _is_glob(str(path)):
+            return [str(path)]
+        files = sorted(glob.glob(str(path)))
+        if not files:
+            raise FileNotFoundError(f"No files match {path}.")
+        return files
+
+    return [str(p) for p in path]
+
+
+def _is_glob(path: str) -> bool:
+    return any(c in path for c in "*?[")
+
+
+def _name(path: Union[str, Sequence[str]]) -> str:
+    """Name of a product from its file or the common directory of its files."""
+    if isinstance(path, (str, PurePath)):
+        p = Path(path)
+        if not _is_glob(str(p)):
+            return p.stem
+        while _is_glob(str(p)):
+            p = p.parent
+        return p.resolve().name
+    files = _files(path)
+    if len(files) == 1:
+        return Path(files[0]).stem
+
+    return Path(os.path.commonpath(files)).resolve().name
+
+
+def _stem(path: Union[str, Sequence[str]]) -> str:
+    """Common start of the file names of a product, without separators at its end."""
+    stems = [Path(f).stem for f in _files(path)]
+
+    return os.path.commonprefix(stems).rstrip("_-. ")
+
+
+def _open(
+    path: Union[str, Sequence[str]],
+    chunks: Optional[Union[int, Dict[str, int]]],
+    parallel: bool,
+    **kwargs: Any
+) -> xr.Dataset:
+    """Open a single file or combine several files lazily."""
+    with stage("io.open_product", path=str(path)) as r:
+        if isinstance(path, (str, PurePath)) and not _is_glob(str(path)):
+            ds = xr.open_dataset(path, chunks=chunks, **kwargs)
+        else:
+            options: Dict[str, Any] = dict(
+                combine="by_coords",
+                data_vars="minimal",
+                coords="minimal",
+                compat="override",
+                parallel=parallel,
+            )
+            options.update(kwargs)
+            ds = xr.open_mfdataset(_files(path), chunks=chunks, **options)
+        sizes(r, ds)
+
+    return ds
+
+
 def save_product(
     ds: Dict[str, xr.Dataset],
     path: str,
     experimental: bool = False,
+    n_workers: Optional[int] = None,
+    executor: Optional[Executor] = None,
+    target: str = "netcdf",
+    complevel: Optional[int] = None,
+    shuffle: bool = True,
+    dtype: Optional[str] = None,
+    chunks: Optional[Union[str, Dict[str, int]]] = None,
+    append_dim: Optional[str] = None,
     **kwargs: Dict[str, Any]
 ) -> None:
+    """Save wind products as files named after the products.
+
+    Parameters
+    ----------
+    ds : dict
+        Wind products by name.
+    path : str
+        Directory to save the files in.
+    experimental : bool, optional
+        Save files directly instead of through Intake, defaults to `False`.
+    n_workers : int, optional
+        Save the products in this many worker processes, defaults to
+        saving them one after another.
+    executor : concurrent.futures.Executor, optional
+        Save the products through this executor.
+    target : {"netcdf", "zarr"}, optional
+        Save netCDF files (``<name>.cdf``) or Zarr stores (``<name>.zarr``),
+        defaults to netCDF.
+    complevel : int, optional
+        Zlib compression level of netCDF variables, defaults to no compression.
+        Zarr stores always use the compression of the Zarr library.
+    shuffle : bool, optional
+        Apply the shuffle filter to compressed netCDF variables, defaults to `True`.
+    dtype : str, optional
+        Data type floating point variables are stored with, e.g. ``"float32"``,
+        defaults to their own data type.
+    chunks : str or dict, optional
+        Chunk sizes on disk by dimension, ``"map"`` for one time step per chunk or
+        ``"series"`` for the whole time series of 32 x 32 grid points per chunk,
+        defaults to the library's default chunking. The presets chunk along
+        `append_dim`, else along dimension ``time`` or the first dimension with
+        datetime coordinates.
+    append_dim : str, optional
+        Append to existing files along this dimension, e.g. ``"time"``, instead of
+        overwriting them. New netCDF files are created with `append_dim` unlimited.
+        Appending to netCDF files requires the netCDF4 package, the ``netcdf``
+        extra, and raises `ValueError` if `append_dim` of the file is not unlimited
+        or it lacks variables of the product.
+
+    """
+    if target not in ("netcdf", "zarr"):
+        raise ValueError(f"Unknown target {target}.")
     if experimental:
-        for k, v in ds.items():
-            v.to_netcdf(Path(path).joinpath(k + ".cdf"))
+        map_products(
+            _save,
+            ds,
+            ds.keys(),
+            path,
+            n_workers=n_workers,
+            executor=executor,
+            target=target,
+            append_dim=append_dim,
+            complevel=complevel,
+            shuffle=shuffle,
+            dtype=dtype,
+            chunks=chunks,
+        )
     else:
         raise NotImplementedError("Export of data is not yet implemented.")
 
     return None
 
 
-def info(wndpr: Dict[str, xr.Dataset], *args: Any, **kwargs: Dict[str, Any]) -> None:
-    raise NotImplementedError("Info of wind products is not yet implemented.")
+def _save(
+    wndkey: str,
+    ds: xr.Dataset,
+    path: str,
+    target: str = "netcdf",
+    append_dim: Optional[str] = None,
+    start: Optional[int] = None,
+    **kwargs: Any
+) -> None:
+    """Save a product, appending along `append_dim` at index `start` if given.
+
+    Steps of an existing product from `start` on, e.g. left by an interrupted
+    append, are overwritten.
+
+    """
+    chunksizes = _chunk_sizes(ds, kwargs.pop("chunks", None), append_dim)
+    encoding = _encoding(ds, target, chunksizes, **kwargs)
+    with stage("io.save_product", product=wndkey, target=target) as r:
+        sizes(r, ds)
+        if target == "zarr":
+            store = Path(path).joinpath(wndkey + ".zarr")
+            if ds.chunks and chunksizes:
+                ds = ds.chunk(chunksizes)
+            if append_dim is not None and store.exists():
+                if start is not None:
+                    _resize_zarr(store, append_dim, start)
+                # appending replaces the attributes of the store, keep the record
+                committed = _zarr_attrs(store).get(_COMMITTED)
+                if committed is not None:
+                    ds = ds.assign_attrs({_COMMITTED: committed})
+                ds.to_zarr(store, append_dim=append_dim)
+            else:
+                ds.to_zarr(store, mode="w", encoding=encoding)
+        else:
+            file = Path(path).joinpath(wndkey + ".cdf")
+            if append_dim is not None and file.exists():
+                _append_netcdf(file, ds, append_dim, start)
+            else:
+                ds.to_netcdf(
+                    file,
+                    encoding=encoding,
+                    unlimited_dims=[append_dim] if append_dim is not None else None,
+                )
+
+
+def _chunk_sizes(
+    ds: xr.Dataset,
+    chunks: Optional[Union[str, Dict[str, int]]],
+    time: Optional[str] = None,
+) -> Dict[Hashable, int]:
+    """Chunk size by dimension from a dict or a preset name.
+
+    The presets chunk along dimension `time`, defaults to :func:`_time_dim`.
+
+    """
+    if chunks is None:
+        return {}
+    if chunks not in ("map", "series"):
+        if isinstance(chunks, str):
+            raise ValueError(f"Unknown chunks {chunks}.")
+        return {d: min(chunks.get(str(d), n), n) for d, n in ds.sizes.items()}
+    t = _time_dim(ds) if time is None else time
+    if chunks == "map":
+        return {d: 1 if d == t else n for d, n in ds.sizes.items()}
+
+    return {d: n if d == t else min(n, 32) for d, n in ds.sizes.items()}
+
+
+def _time_dim(ds: xr.Dataset) -> Hashable:
+    """Dimension ``time`` of `ds`, else the first one with datetime coordinates."""
+    if "time" in ds.dims:
+        return "time"
+    for d in ds.dims:
+        if d in ds.coords and ds[d].dtype.kind == "M":
+            return d
+    raise ValueError(
+        "The chunk presets require a dimension time or with datetime coordinates."
+    )
+
+
+def _encoding(
+    ds: xr.Dataset,
+    target: str,
+    sizes: Dict[Hashable, int],
+    complevel: Optional[int] = None,
+    shuffle: bool = True,
+    dtype: Optional[str] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """Encoding of the data variables of `ds`."""
+    encoding: Dict[str, Dict[str, Any]] = {}
+    for name, var in ds.data_vars.items():
+        e: Dict[str, Any] = {}
+        if dtype is not None and var.dtype.kind == "f":
+            e["dtype"] = dtype
+        if sizes and var.ndim > 0:
+            shape = tuple(max(sizes[d], 1) for d in var.dims)
+            e["chunks" if target == "zarr" else "chunksizes"] = shape
+        if complevel is not None and target == "netcdf":
+            e.update(zlib=True, complevel=complevel, shuffle=shuffle)
+        encoding[str(name)] = e
+
+    return encoding
+
+
+def _append_netcdf(
+    file: Path, ds: xr.Dataset, dim: str, start: Optional[int] = None
+) -> None:
+    """Append `ds` to a netCDF file along its unlimited dimension `dim`.
+
+    The new values are encoded like the variables already in the file and written
+    from index `start`, defaults to the end of the file.
+
+    """
+    netCDF4 = _netcdf4()
+
+    keys = ["units", "calendar", "dtype", "scale_factor", "add_offset", "_FillValue"]
+    with xr.open_dataset(file, cache=False) as existing:
+        encodings = {
+            name: {k: v for k, v in var.encoding.items() if k in keys}
+            for name, var in existing.variables.items()
+        }
+    with netCDF4.Dataset(file, "a") as nc:
+        if dim not in nc.dimensions or not nc.dimensions[dim].isunlimited():
+            raise ValueError(
+                f"Cannot append along {dim}, it is not an unlimited dimension of "
+                f"{file}."
+            )
+        missing = [
+            str(name)
+            for name, var in ds.variables.items()
+            if dim in var.dims and name not in nc.variables
+        ]
+        if missing:
+            raise ValueError(
+                f"Cannot append variables {', '.join(missing)} missing in {file}."
+            )
+        nc.set_auto_maskandscale(False)
+        if start is None:
+            start = len(nc.dimensions[dim])
+        for name, var in ds.variables.items():
+            if dim not in var.dims:
+                continue
+            var = var.copy(deep=False)
+            var.encoding = encodings[name]
+            data = np.asarray(xr.conventions.encode_cf_variable(var, name=name).values)
+            index = [slice(None)] * var.ndim
+            index[var.dims.index(dim)] = slice(start, start + var.sizes[dim])
+            nc.variables[str(name)][tuple(index)] = data
+
+
+def _netcdf4() -> Any:
+    """The netCDF4 module, which appending to netCDF files requires."""
+    try:
+        import netCDF4
+    except ImportError as e:
+        raise ImportError(
+            "Appending to netCDF files requires netCDF4, install it with the "
+            "netcdf extra: pip install windeval[netcdf]"
+        ) from e
+
+    return netCDF4
+
+
+_COMMITTED = "windeval_committed"
+"""Attribute of appended products with the number of complete steps."""
+
+
+def _committed(store: Path, dim: str) -> Tuple[int, np.ndarray]:
+    """Complete steps of a saved product along `dim` and their coordinate values.
+
+    Steps beyond the number recorded by :func:`_commit` were left by an interrupted
+    append. Products without the record are complete.
+
+    """
+    if store.suffix == ".zarr":
+        import zarr
+
+        group: Any = zarr.open_group(str(store), mode="r")
+        attrs, coord = dict(group.attrs), group[dim]
+        values, coord_attrs = coord[:], dict(coord.attrs)
+    else:
+        netCDF4 = _netcdf4()
+
+        with netCDF4.Dataset(store) as nc:
+            nc.set_auto_maskandscale(False)
+            attrs = {k: nc.getncattr(k) for k in nc.ncattrs()}
+            var = nc.variables[dim]
+            values = var[:]
+            coord_attrs = {k: var.getncattr(k) for k in var.ncattrs()}
+    n = int(attrs.get(_COMMITTED, len(values)))
+    coord_attrs.pop("_ARRAY_DIMENSIONS", None)
+    decoded = xr.conventions.decode_cf_variable(
+        dim, xr.Variable(dim, np.asarray(values)[:n], coord_attrs)
+    )
+
+    return n, decoded.values
+
+
+def _commit(store: Path, n: int) -> None:
+    """Record `n` complete steps of a saved product, see :func:`_committed`."""
+    if store.suffix == ".zarr":
+        import zarr
+
+        zarr.open_group(str(store), mode="r+").attrs[_COMMITTED] = n
+        zarr.consolidate_metadata(str(store))
+    else:
+        netCDF4 = _netcdf4()
+
+        with netCDF4.Dataset(store, "a") as nc:
+            nc.setncattr(_COMMITTED, n)
+
+
+def _zarr_attrs(store: Path) -> Dict[str, Any]:
+    """Attributes of the root group of a Zarr store."""
+    import zarr
+
+    return dict(zarr.open_group(str(store), mode="r").attrs)
+
+
+def _resize_zarr(store: Path, dim: str, n: int) -> None:
+    """Cut the arrays of a Zarr store to `n` steps along `dim`."""
+    import zarr
+
+    group: Any = zarr.open_group(str(store), mode="r+")
+    for _, array in group.arrays():
+        dims = array.attrs.get("_ARRAY_DIMENSIONS") or getattr(
+            array.metadata, "dimension_names", None
+        )
+        if dims and dim in dims and array.shape[list(dims).index(dim)] > n:
+            shape = list(array.shape)
+            shape[list(dims).index(dim)] = n
+            array.resize(tuple(shape))
+    zarr.consolidate_metadata(str(store))
+
+
+def info(
+    wndpr: Union[str, Dict[str, xr.Dataset]],
+    *args: str,
+    catalog: Optional[Union[str, PurePath, Catalog]] = None
+) -> Dict[str, Dict[str, Any]]:
+    """Describe wind products from their metadata.
+
+    No data is read, products in a catalog are described from the catalog alone.
+
+    Parameters
+    ----------
+    wndpr : dict or str
+        Wind products by name, or name of a product in `catalog`.
+    *args : str, optional
+        Names of further products in `catalog`.
+    catalog : Catalog or str or path, optional
+        Catalog, or its file, of the products named.
+
+    Returns
+    -------
+    dict
+        Description of each product by name, with the dimensions, shape, data type
+        and chunk sizes on disk (`None` if not chunked) of its ``variables``, the
+        size and range of its one-dimensional ``coordinates``, its ``attrs`` and,
+        from a catalog, the number of ``files`` and their size in ``bytes``.
+
+    """
+    if isinstance(wndpr, dict):
+        return {name: _describe(ds) for name, ds in wndpr.items()}
+    if catalog is None:
+        raise ValueError("Products given by name require a catalog.")
+    if not isinstance(catalog, Catalog):
+        catalog = Catalog(catalog)
+    described = {}
+    for name in [wndpr, *args]:
+        files = catalog.files(name)
+        described[name] = _describe(catalog.open(name))
+        described[name]["files"] = len(files)
+        described[name]["bytes"] = sum(f["size"] for f in files)
+
+    return described
+
+
+def _describe(ds: xr.Dataset) -> Dict[str, Any]:
+    variables = {}
+    for name, var in ds.data_vars.items():
+        chunks = var.encoding.get("chunksizes", var.encoding.get("chunks"))
+        variables[name] = {
+            "dims": var.dims,
+            "shape": var.shape,
+            "dtype": var.dtype,
+            "chunksizes": None if chunks is None else tuple(chunks),
+        }
+    coordinates = {}
+    for name, coord in ds.coords.items():
+        if coord.ndim == 1 and coord.size > 0:
+            values = coord.values
+            coordinates[name] = {
+                "size": coord.size,
+                "min": values.min() if values.dtype.kind in "iufmM" else values[0],
+                "max": values.max() if values.dtype.kind in "iufmM" else values[-1],
+            }
+
+    return {"variables": variables, "coordinates": coordinates, "attrs": ds.attrs}
 
 
 def select(
-    wndpr: Dict[str, xr.Dataset], *args: Any, **kwargs: Dict[str, Any]
+    wndpr: Dict[str, xr.Dataset],
+    *args: str,
+    bbox: Optional[Sequence[float]] = None,
+    time: Optional[Union[slice, Sequence[Any]]] = None,
+    stations: Optional[
+        Union[Sequence[Sequence[float]], Dict[Any, Sequence[float]]]
+    ] = None,
+    **kwargs: Any
 ) -> Dict[str, xr.Dataset]:
-    raise NotImplementedError(
-        "Selecting and slicing of dataset is not yet implemented."
+    """Select variables, a region, a period or stations of wind products.
+
+    Selections only index the datasets, products opened lazily stay lazy and only
+    the chunks or parts of files needed for the selection are read later on.
+
+    Parameters
+    ----------
+    wndpr : dict
+        Wind products by name.
+    *args : str, optional
+        Names of the variables to keep, defaults to all.
+    bbox : sequence of float, optional
+        Region as ``(west, south, east, north)`` in degrees. Longitudes are matched
+        modulo 360, a region across the antimeridian has ``west > east``.
+    time : slice or sequence, optional
+        Period as ``(start, end)`` or slice of labels, both ends included.
+    stations : sequence or dict, optional
+        Locations as ``(longitude, latitude)`` in degrees, optionally by station
+        name. Each is replaced by its nearest grid point along a new dimension
+        ``station``, with coordinates of the stations and their distance to the
+        grid point in m.
+    **kwargs
+        Labels of further dimensions, passed on to :meth:`xarray.Dataset.sel`.
+
+    Returns
+    -------
+    dict
+        Selected wind products by name.
+
+    """
+    selected = {}
+    for name, ds in wndpr.items():
+        if args:
+            ds = ds[list(args)]
+        if kwargs:
+            ds = ds.sel(**kwargs)
+        if time is not None:
+            if not isinstance(time, slice):
+                time = slice(*time)
+            ds = ds.isel(time=ds.indexes["time"].slice_indexer(time.start, time.stop))
+        if bbox is not None:
+            ds = ds.isel(_bbox_indexers(ds, *bbox))
+        if stations is not None:
+            ds = _select_stations(ds, stations)
+        selected[name] = ds
+
+    return selected
+
+
+def _bbox_indexers(
+    ds: xr.Dataset, west: float, south: float, east: float, north: float
+) -> Dict[str, Any]:
+    """Indexers of the grid points of `ds` within a region."""
+    lat, lon = ds.latitude.values, ds.longitude.values
+    in_lat = (lat >= south) & (lat <= north)
+    in_lon = np.ones(lon.shape, dtype=bool)
+    if east - west < 360:
+        in_lon = (lon - west) % 360 <= (east - west) % 360
+    if lat.ndim == 1 and lon.ndim == 1:
+        return {"latitude": _indexer(in_lat), "longitude": _indexer(in_lon)}
+
+    inside = in_lat & in_lon
+    dims = ds.latitude.dims
+
+    return {
+        d: _indexer(inside.any(axis=tuple(j for j in range(len(dims)) if j != i)))
+        for i, d in enumerate(dims)
+    }
+
+
+def _indexer(mask: np.ndarray) -> Union[slice, np.ndarray]:
+    """Slice of `mask` if its points are contiguous, else their indices.
+
+    Indices of points that wrap around the end, like longitudes across the
+    antimeridian, start after the largest gap.
+
+    """
+    i = np.flatnonzero(mask)
+    if len(i) == 0:
+        return slice(0, 0)
+    if i[-1] - i[0] + 1 == len(i):
+        return slice(i[0], i[-1] + 1)
+    gap = np.argmax(np.diff(i)) + 1
+
+    return np.roll(i, -gap)
+
+
+def _select_stations(
+    ds: xr.Dataset,
+    stations: Union[Sequence[Sequence[float]], Dict[Any, Sequence[float]]],
+) -> xr.Dataset:
+    """Nearest grid points of `stations` along a new dimension ``station``."""
+    names, points = station_points(stations)
+    lat, lon = ds.latitude, ds.longitude
+    distance, indices = grid_index(lat.values, lon.values).query(
+        points[:, 1], points[:, 0]
     )
+    dims = ["latitude", "longitude"] if lat.ndim == 1 else list(lat.dims)
+    ds = ds.isel({d: xr.DataArray(i, dims="station") for d, i in zip(dims, indices)})
+    coords: Dict[str, Any] = {
+        "station_longitude": ("station", points[:, 0]),
+        "station_latitude": ("station", points[:, 1]),
+        "station_distance": ("station", distance),
+    }
+    if names is not None:
+        coords["station"] = ("station", names)
+
+    return ds.assign_coords(coords)
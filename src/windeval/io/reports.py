@@ -1,7 +1,277 @@
-from typing import Any, Dict
+import hashlib
+import html
+import json
+import os
 
+from concurrent.futures import Executor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
 import xarray as xr
 
+from .._cache import Cache, _unlink, fingerprint
+from .._parallel import map_products
+from ..instrumentation import stage
+from .products import _describe
+
+
+_VERSION = 1
+"""Version of the report layout, changing it regenerates all sections."""
+
+_MANIFEST = "report.json"
+
+_STYLE = """
+body { font-family: sans-serif; margin: 2em; }
+table { border-collapse: collapse; margin: 1em 0; }
+td, th { border: 1px solid #ccc; padding: 0.2em 0.6em; text-align: right; }
+img { max-width: 100%; }
+"""
+
+
+def report(
+    wnd: Dict[str, xr.Dataset],
+    path: Union[str, Path],
+    variables: Optional[Iterable[str]] = None,
+    diagnostics: Iterable[str] = ("welch",),
+    n_workers: Optional[int] = None,
+    executor: Optional[Executor] = None,
+    **kwargs: Any
+) -> Path:
+    """Write an HTML report of wind products with figures of their diagnostics.
+
+    The report has a section for each variable of each product, with a summary of
+    its coordinates, a figure of the variable and figures of its `diagnostics`,
+    and a section comparing each variable between the products. Sections are
+    identified by a fingerprint of their data and parameters. Writing the report
+    again into the same directory only recomputes and redraws the sections whose
+    products or parameters changed, in worker processes if requested.
+
+    Parameters
+    ----------
+    wnd : dict
+        Wind products by name.
+    path : str or path
+        Directory of the report, created if missing. The report is
+        ``index.html`` with figures in ``figures``.
+    variables : iterable of str, optional
+        Names of the variables to report, defaults to all data variables.
+    diagnostics : iterable of str, optional
+        Names of diagnostics of :func:`windeval.processing.diagnostics` to plot
+        for each variable with a time dimension, defaults to ``("welch",)``. They
+        are evaluated along time and averaged over latitude and longitude.
+    n_workers : int, optional
+        Generate the changed sections in this many worker processes.
+    executor : concurrent.futures.Executor, optional
+        Generate the changed sections through this executor.
+    **kwargs
+        Passed on to the diagnostics, e.g. ``nperseg``.
+
+    Returns
+    -------
+    pathlib.Path
+        Path of ``index.html``.
+
+    """
+    path = Path(path)
+    path.joinpath("figures").mkdir(parents=True, exist_ok=True)
+    manifest = _load_manifest(path)
+    diagnostics = list(diagnostics)
+    if variables is None:
+        variables = list(
+            dict.fromkeys(str(v) for ds in wnd.values() for v in ds.data_vars)
+        )
+    else:
+        variables = list(variables)
+    prints = {
+        (k, v): fingerprint(ds[v])
+        for k, ds in wnd.items()
+        for v in variables
+        if v in ds
+    }
+    params = json.dumps([_VERSION, diagnostics, kwargs], sort_keys=True, default=str)
+
+    sections: Dict[str, str] = {}
+    todo: Dict[Tuple[str, str], xr.Dataset] = {}
+    for (k, v), fp in prints.items():
+        sid = _section_id(k, v)
+        sections[sid] = Cache.key(fp, params)
+        if not _is_current(path, manifest, sid, sections[sid]):
+            todo[k, v] = wnd[k][[v]]
+    with stage("io.report_sections", changed=len(todo)):
+        results = map_products(
+            _product_section,
+            todo,
+            todo.keys(),
+            diagnostics,
+            kwargs,
+            n_workers=n_workers,
+            executor=executor,
+        )
+    for (k, v), (fragment, images) in results.items():
+        sid = _section_id(k, v)
+        manifest[sid] = _store(path, manifest.get(sid), sections[sid], fragment, images)
+
+    for v in variables:
+        names = [k for k in wnd if (k, v) in prints]
+        if len(names) < 2:
+            continue
+        sid = _section_id(v, compare=True)
+        sections[sid] = Cache.key(*[prints[k, v] for k in names], params, *names)
+        if not _is_current(path, manifest, sid, sections[sid]):
+            with stage("io.report_compare", variable=v):
+                fragment = _compare_section(v, {k: wnd[k] for k in names})
+            manifest[sid] = _store(path, manifest.get(sid), sections[sid], fragment, {})
+
+    for sid in set(manifest) - set(sections):
+        for f in manifest.pop(sid)["files"]:
+            _unlink(path.joinpath("figures", f))
+    _save_manifest(path, {sid: manifest[sid] for sid in sections})
+
+    index = path.joinpath("index.html")
+    body = "\n".join(manifest[sid]["html"] for sid in sections)
+    _write(
+        index,
+        "<!DOCTYPE html>\n<html>\n<head>\n<meta charset='utf-8'>\n"
+        f"<title>Wind products</title>\n<style>{_STYLE}</style>\n</head>\n<body>\n"
+        f"<h1>Wind products: {html.escape(', '.join(wnd))}</h1>\n{body}\n"
+        "</body>\n</html>\n",
+    )
+
+    return index
+
+
+def _section_id(*parts: str, compare: bool = False) -> str:
+    """Id of the section of product and variable `parts` or of a comparison.
+
+    Characters other than letters and digits are replaced for HTML ids and file
+    names, a hash of the original parts keeps ids unique.
+
+    """
+    names = ("compare",) + parts if compare else parts
+    digest = hashlib.sha256(json.dumps([compare, *parts]).encode()).hexdigest()
+    readable = "-".join("".join(c if c.isalnum() else "_" for c in p) for p in names)
+
+    return f"{readable}-{digest[:8]}"
+
+
+def _load_manifest(path: Path) -> Dict[str, Any]:
+    try:
+        with open(path.joinpath(_MANIFEST)) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _save_manifest(path: Path, manifest: Dict[str, Any]) -> None:
+    _write(path.joinpath(_MANIFEST), json.dumps(manifest, indent=1))
+
+
+def _write(file: Path, text: str) -> None:
+    """Write `text` to `file` atomically, so an interrupted run leaves no stubs."""
+    tmp = file.with_name(file.name + ".tmp")
+    tmp.write_text(text)
+    os.replace(tmp, file)
+
+
+def _is_current(path: Path, manifest: Dict[str, Any], sid: str, key: str) -> bool:
+    entry = manifest.get(sid)
+
+    return (
+        entry is not None
+        and entry["key"] == key
+        and all(path.joinpath("figures", f).exists() for f in entry["files"])
+    )
+
+
+def _store(
+    path: Path,
+    old: Optional[Dict[str, Any]],
+    key: str,
+    fragment: str,
+    images: Dict[str, bytes],
+) -> Dict[str, Any]:
+    """Write the figures of a section and return its manifest entry."""
+    for f in set(old["files"] if old else []) - set(images):
+        _unlink(path.joinpath("figures", f))
+    for f, image in images.items():
+        path.joinpath("figures", f).write_bytes(image)
+
+    return {"key": key, "html": fragment, "files": sorted(images)}
+
+
+def _product_section(
+    key: Tuple[str, str],
+    ds: xr.Dataset,
+    diagnostics: List[str],
+    kwargs: Dict[str, Any],
+) -> Tuple[str, Dict[str, bytes]]:
+    """HTML and figures of the section of variable ``key[1]`` of product ``key[0]``."""
+    from .. import processing
+    from ..plotting import _render
+
+    product, var = key
+    sid = _section_id(product, var)
+    with stage("io.report_section", section=sid):
+        figures = {f"{sid}.png": (var, ds)}
+        if "time" in ds[var].dims:
+            for diag in diagnostics:
+                y = processing.diagnostics(ds[var], diag, dim="time", **kwargs)
+                if isinstance(y, xr.DataArray):
+                    y = y.to_dataset(name=f"{var}_{diag}")
+                y = y.mean([d for d in ("latitude", "longitude") if d in y.dims])
+                for v in y.data_vars:
+                    figures[f"{sid}-{diag}-{v}.png"] = (str(v), y)
+        images = {
+            f: _render((product, v), d, "minmax", (8.0, 4.5), 100, "png")
+            for f, (v, d) in figures.items()
+        }
+        summary = _describe(ds)
+        rows = [
+            [c, i["size"], i["min"], i["max"]]
+            for c, i in summary["coordinates"].items()
+        ]
+        fragment = (
+            f"<section id='{sid}'>\n"
+            f"<h2>{html.escape(product)}: {html.escape(var)}</h2>\n"
+            + _table(["coordinate", "size", "min", "max"], rows)
+            + "".join(
+                f"<img src='figures/{html.escape(f)}' alt='{html.escape(f)}'>\n"
+                for f in images
+            )
+            + "</section>"
+        )
+
+    return fragment, images
+
+
+def _compare_section(var: str, wnd: Dict[str, xr.Dataset]) -> str:
+    """HTML of the global comparison metrics of `var` between products."""
+    from ..processing import compare
+
+    dims = [str(d) for d in next(iter(wnd.values()))[var].dims]
+    metrics = compare(wnd, var, dims=dims)
+    columns = ["bias", "rmse", "mae", "correlation", "std_ratio", "n"]
+    rows = [
+        [f"{a} - {b}"] + [float(m[c]) if c != "n" else int(m[c]) for c in columns]
+        for (a, b), m in metrics.items()
+    ]
+    sid = _section_id(var, compare=True)
+
+    return (
+        f"<section id='{sid}'>\n<h2>{html.escape(var)}: comparison</h2>\n"
+        + _table(["products"] + columns, rows)
+        + "</section>"
+    )
+
+
+def _table(header: List[str], rows: List[List[Any]]) -> str:
+    def cell(x: Any) -> str:
+        if isinstance(x, (float, np.floating)):
+            return f"{x:.4g}"
+        return html.escape(str(x))
+
+    lines = ["<table>", "<tr>" + "".join(f"<th>{cell(h)}</th>" for h in header)]
+    lines += ["<tr>" + "".join(f"<td>{cell(x)}</td>" for x in r) for r in rows]
 
-def report(wnd: Dict[str, xr.Dataset], *args: Any, **kwargs: Dict[str, Any]) -> None:
-    raise NotImplementedError("Generation of reports is not yet implemented.")
+    return "\n".join(lines + ["</table>\n"])
@@ -1,15 +1,26 @@
+import io
+import math
+import pickle
+
+from concurrent.futures import Executor
 from functools import singledispatch
-from typing import Any, Dict, List, Optional, Union
+from pathlib import Path
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple, Union
 
-import matplotlib.pyplot as plt
+import numpy as np
 import xarray as xr
 
+from ._parallel import map_products
+from .instrumentation import stage
+
 
 class Plot:
     @staticmethod
     def power_spectral_density(
         wnd: Dict[str, xr.Dataset], *args: Any, **kwargs: Dict[str, Any]
     ) -> None:
+        import matplotlib.pyplot as plt
+
         for wndkey in wnd.keys():
             plt.semilogx(wnd[wndkey].power_spectral_density)
 
@@ -34,9 +45,16 @@ def _(
     var: str,
     *args: Any,
     dataset: Optional[Union[str, List[str]]] = None,
-    **kwargs: Dict[str, Any]
-) -> None:
+    n_workers: Optional[int] = None,
+    executor: Optional[Executor] = None,
+    output: Optional[Union[str, Path]] = None,
+    **kwargs: Any
+) -> Optional[Dict[Tuple[str, str], Union[bytes, Path]]]:
 
+    if output is not None:
+        return render(
+            wnddict, var, output, n_workers=n_workers, executor=executor, **kwargs
+        )
     if dataset is None:
         dataset = []
     else:
@@ -45,9 +63,242 @@ def _(
         )
 
     if getattr(Plot, var, None) is not None:
+        if n_workers is not None or executor is not None:
+            raise ValueError(
+                f"Plots of {var} combine all products and are drawn without workers."
+            )
         getattr(Plot, var)(wnddict, *dataset, *args, **kwargs)
-    else:
+    elif n_workers is None and executor is None:
         for wndkey in wnddict.keys():
             wnddict[wndkey][var].plot()
+    else:
+        # each product is drawn into its own figure by a worker process
+        figures = map_products(
+            _draw,
+            {wndkey: wnddict[wndkey][[var]] for wndkey in wnddict.keys()},
+            wnddict.keys(),
+            var,
+            n_workers=n_workers,
+            executor=executor,
+        )
+        for fig in figures.values():
+            pickle.loads(fig)
 
     return None
+
+
+def _draw(wndkey: str, ds: xr.Dataset, var: str) -> bytes:
+    """Draw `var` into a new figure and return it pickled.
+
+    Unpickling registers the figure with :mod:`matplotlib.pyplot` again.
+
+    """
+    import matplotlib.pyplot as plt
+
+    fig = plt.figure()
+    da: Any = ds[var]
+    da.plot()
+    data = pickle.dumps(fig)
+    plt.close(fig)
+
+    return data
+
+
+def render(
+    wnddict: Dict[str, xr.Dataset],
+    variables: Union[str, Iterable[str]],
+    output: Optional[Union[str, Path]] = None,
+    method: str = "minmax",
+    figsize: Tuple[float, float] = (8.0, 4.5),
+    dpi: int = 100,
+    format: str = "png",
+    n_workers: Optional[int] = None,
+    executor: Optional[Executor] = None,
+) -> Dict[Tuple[str, str], Union[bytes, Path]]:
+    """Render variables of wind products off-screen, downsampled to the figure size.
+
+    Figures are drawn with the Agg backend without :mod:`matplotlib.pyplot`, so no
+    global state is touched and no display is needed. Before drawing, series are
+    decimated to about two points per pixel column of the figure and maps are
+    coarsened by block means to at most one cell per pixel, so only the reduced
+    data is loaded from Dask-backed products. Variables with more dimensions are
+    drawn at the first index of the other dimensions, as a map if they have
+    ``latitude`` and ``longitude``, otherwise as a series along ``time``,
+    ``frequency`` or their first dimension.
+
+    Parameters
+    ----------
+    wnddict : dict
+        Wind products by name.
+    variables : str or iterable of str
+        Names of the variables to render, each in its own figure.
+    output : str or path, optional
+        Directory to save the figures in as ``<product>_<variable>.<format>``,
+        defaults to returning them.
+    method : {"minmax", "lttb"}, optional
+        Decimation of series: minimum and maximum of each pixel column, which keeps
+        all extremes, or Largest-Triangle-Three-Buckets, which keeps the visual
+        shape with one point per pixel column, defaults to ``"minmax"``.
+    figsize : tuple of float, optional
+        Size of the figures in inches, defaults to ``(8.0, 4.5)``.
+    dpi : int, optional
+        Resolution of the figures, defaults to 100.
+    format : str, optional
+        File format of the figures, defaults to ``"png"``.
+    n_workers : int, optional
+        Render the figures in this many worker processes, defaults to
+        rendering them one after another.
+    executor : concurrent.futures.Executor, optional
+        Render the figures through this executor.
+
+    Returns
+    -------
+    dict
+        Rendered figures, or the paths of their files, by product and variable.
+
+    """
+    if method not in ("minmax", "lttb"):
+        raise ValueError(f"Unknown method {method}.")
+    variables = [variables] if isinstance(variables, str) else list(variables)
+    figures = {(k, v): wnddict[k][[v]] for k in wnddict for v in variables}
+    options: Dict[str, Any] = dict(
+        method=method, figsize=figsize, dpi=dpi, format=format
+    )
+    images = map_products(
+        _render,
+        figures,
+        figures.keys(),
+        n_workers=n_workers,
+        executor=executor,
+        **options
+    )
+    if output is None:
+        return images
+    paths: Dict[Tuple[str, str], Union[bytes, Path]] = {}
+    for (k, v), image in images.items():
+        paths[k, v] = Path(output).joinpath(f"{k}_{v}.{format}")
+        paths[k, v].write_bytes(image)  # type: ignore
+
+    return paths
+
+
+def _render(
+    key: Tuple[str, str],
+    ds: xr.Dataset,
+    method: str,
+    figsize: Tuple[float, float],
+    dpi: int,
+    format: str,
+) -> bytes:
+    """Draw variable ``key[1]`` of `ds` into a new Agg figure and return the image."""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    with stage("plotting.render", product=key[0], variable=key[1]):
+        da, selected = _drawable(ds[key[1]])
+        fig = Figure(figsize=figsize, dpi=dpi)
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        width, height = int(figsize[0] * dpi), int(figsize[1] * dpi)
+        if da.ndim == 2:
+            da = _coarsen(da, {"latitude": height, "longitude": width}).load()
+            mesh = ax.pcolormesh(
+                da.longitude.values, da.latitude.values, da.values, shading="auto"
+            )
+            fig.colorbar(mesh, ax=ax, label=_label(da))
+            ax.set_xlabel(_label(da.longitude))
+            ax.set_ylabel(_label(da.latitude))
+        else:
+            dim = da.dims[0]
+            x = da[dim].values if dim in da.coords else np.arange(da.size)
+            y = np.asarray(da.values)
+            decimate = _lttb if method == "lttb" else _minmax
+            x, y = decimate(x, y, width)
+            if dim == "frequency":
+                ax.semilogx(x, y)
+            else:
+                ax.plot(x, y)
+            ax.set_xlabel(_label(da[dim]) if dim in da.coords else str(dim))
+            ax.set_ylabel(_label(da))
+            ax.grid()
+        ax.set_title(", ".join([key[0]] + selected))
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format=format)
+
+    return buffer.getvalue()
+
+
+def _drawable(da: xr.DataArray) -> Tuple[xr.DataArray, List[str]]:
+    """`da` reduced to a map or a series at the first index of other dimensions."""
+    if "latitude" in da.dims and "longitude" in da.dims:
+        keep: List[Hashable] = ["latitude", "longitude"]
+    else:
+        keep = [next((d for d in ["time", "frequency"] if d in da.dims), da.dims[0])]
+    other = [d for d in da.dims if d not in keep]
+    selected = [
+        f"{d} = {da[d].values[0]}" if d in da.coords else f"{d} = 0" for d in other
+    ]
+
+    return da.isel({d: 0 for d in other}).transpose(*keep), selected
+
+
+def _label(da: xr.DataArray) -> str:
+    name = da.attrs.get("long_name", da.name)
+    units = da.attrs.get("units")
+
+    return f"{name} [{units}]" if units else str(name)
+
+
+def _coarsen(da: xr.DataArray, cells: Dict[str, int]) -> xr.DataArray:
+    """Block means of `da` with at most `cells` cells along each dimension."""
+    window = {d: math.ceil(da.sizes[d] / n) for d, n in cells.items()}
+    window = {d: w for d, w in window.items() if w > 1}
+    if not window:
+        return da
+
+    return da.coarsen(window, boundary="trim", coord_func="mean").mean()
+
+
+def _minmax(x: np.ndarray, y: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Minimum and maximum of `y` in each of `n` buckets, in the order of `x`."""
+    if len(y) <= 2 * n:
+        return x, y
+    size = math.ceil(len(y) / n)
+    pad = -len(y) % size
+    buckets = np.pad(y.astype(float), (0, pad), constant_values=np.nan)
+    buckets = buckets.reshape(-1, size)
+    start = np.arange(0, len(y), size)
+    finite = ~np.isnan(buckets).all(axis=1)
+    buckets, start = buckets[finite], start[finite]
+    low = start + np.nanargmin(buckets, axis=1)
+    high = start + np.nanargmax(buckets, axis=1)
+    i = np.sort(np.stack([low, high], axis=1), axis=1).ravel()
+    i = i[np.concatenate([[True], np.diff(i) > 0])]
+
+    return x[i], y[i]
+
+
+def _lttb(x: np.ndarray, y: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Largest-Triangle-Three-Buckets decimation of `y` to `n` points.
+
+    Keeps the first and the last point and from each bucket in between the point
+    forming the largest triangle with the point kept before and the mean of the
+    next bucket (Steinarsson, 2013).
+
+    """
+    if len(y) <= n or n < 3:
+        return x, y
+    t = x.astype(np.int64).astype(float) if x.dtype.kind in "mM" else x.astype(float)
+    v = y.astype(float)
+    edges = np.linspace(1, len(y) - 1, n - 1).astype(int)
+    kept = np.empty(n, dtype=int)
+    kept[0], kept[-1] = 0, len(y) - 1
+    for k in range(n - 2):
+        lo, hi = edges[k], edges[k + 1]
+        nxt = slice(hi, edges[k + 2] if k + 2 < n - 1 else len(y))
+        tn, vn = np.nanmean(t[nxt]), np.nanmean(v[nxt])
+        a = kept[k]
+        area = np.abs((t[a] - tn) * (v[lo:hi] - v[a]) - (t[a] - t[lo:hi]) * (vn - v[a]))
+        kept[k + 1] = lo + int(np.nanargmax(area)) if np.isfinite(area).any() else lo
+
+    return x[kept], y[kept]
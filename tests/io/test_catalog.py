@@ -0,0 +1,112 @@
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from windeval.io import catalog, products
+
+
+@pytest.fixture
+def files(X, tmp_path):
+    pytest.importorskip("dask")
+    X = X.assign_coords(time=pd.date_range("2000-01-01", periods=6, freq="h"))
+    X.eastward_wind.attrs["units"] = "m s-1"
+    (tmp_path / "era").mkdir()
+    for t in range(0, 6, 2):
+        X.isel(time=slice(t, t + 2)).to_netcdf(
+            tmp_path / "era" / f"day_{t}.cdf",
+            encoding={"eastward_wind": {"chunksizes": (1, 5, 5, 4)}},
+        )
+    return X, tmp_path
+
+
+def test_catalog(files):
+    X, tmp_path = files
+    c = catalog.Catalog(tmp_path / "catalog.sqlite")
+    assert c.add("era", str(tmp_path / "era" / "day_*.cdf")) == 3
+    assert c.products() == ["era"]
+    assert "era" in c and "ncep" not in c
+    ds = c.open("era")
+    assert ds.eastward_wind.chunks[0] == (2, 2, 2)
+    assert ds.eastward_wind.encoding["chunksizes"] == (1, 5, 5, 4)
+    xr.testing.assert_identical(ds.load(), X)
+    assert c.open("era", chunks={"time": 3}).eastward_wind.chunks[0] == (3, 3)
+
+    # only new and modified files are indexed again
+    assert c.update() == {"era": 0}
+    later = X.isel(time=slice(0, 2))
+    later["time"] = later.time + np.timedelta64(6, "h")
+    later.to_netcdf(tmp_path / "era" / "day_6.cdf")
+    os.remove(tmp_path / "era" / "day_0.cdf")
+    assert catalog.Catalog(tmp_path / "catalog.sqlite").update("era") == {"era": 1}
+    assert len(c.files("era")) == 3
+    xr.testing.assert_identical(
+        c.open("era").time, xr.concat([X.time[2:], later.time], "time")
+    )
+
+    # modified files are detected when read
+    X.isel(time=slice(2, 3)).to_netcdf(tmp_path / "era" / "day_2.cdf")
+    with pytest.raises(RuntimeError):
+        c.open("era").load()
+
+    c.remove("era")
+    assert c.products() == []
+    with pytest.raises(KeyError):
+        c.open("era")
+
+
+def test_catalog_products(files):
+    X, tmp_path = files
+    X.to_netcdf(tmp_path / "ncep.cdf")
+    c = catalog.Catalog(tmp_path / "catalog.sqlite")
+    c.add("era", str(tmp_path / "era" / "day_*.cdf"))
+    c.add("ncep", [str(tmp_path / "ncep.cdf")])
+    wnddict = products.open_product(
+        "era", "ncep", experimental=True, catalog=tmp_path / "catalog.sqlite"
+    )
+    assert list(wnddict) == ["era", "ncep"]
+    xr.testing.assert_identical(wnddict["ncep"].load(), X)
+    i = products.info("era", "ncep", catalog=c)
+    assert i["era"]["files"] == 3
+    assert i["era"]["bytes"] == sum(
+        os.path.getsize(p) for p in (tmp_path / "era").iterdir()
+    )
+    assert i["era"]["variables"]["eastward_wind"]["shape"] == (6, 5, 5, 4)
+    assert i["era"]["variables"]["eastward_wind"]["dtype"] == np.float64
+    assert i["era"]["variables"]["eastward_wind"]["chunksizes"] == (1, 5, 5, 4)
+    assert i["ncep"]["coordinates"]["time"]["max"] == X.time.values[-1]
+    assert i["ncep"]["coordinates"]["latitude"]["size"] == 5
+
+    # coordinates with the same values are stored once, the times of each file,
+    # depth and latitude, and longitude
+    with sqlite3.connect(c.path) as con:
+        n = con.execute(
+            "SELECT COUNT(*) FROM coordinates WHERE product = 'era'"
+        ).fetchone()[0]
+    assert n == 3 + 2
+
+    for f in (tmp_path / "era").iterdir():
+        f.unlink()
+    with pytest.warns(UserWarning, match="era"):
+        assert c.update() == {"era": 0, "ncep": 0}
+    assert c.files("era") == []
+    assert len(c.files("ncep")) == 1
+    with sqlite3.connect(c.path) as con:
+        keys = con.execute("SELECT DISTINCT product FROM coordinates").fetchall()
+    assert keys == [("ncep",)]
+
+
+def test_catalog_tiles(files):
+    X, tmp_path = files
+    for t in range(0, 6, 3):
+        for j in range(0, 5, 3):
+            tile = X.isel(time=slice(t, t + 3), latitude=slice(j, j + 3))
+            tile.to_netcdf(tmp_path / f"tile_{t}_{j}.cdf")
+    c = catalog.Catalog(tmp_path / "catalog.sqlite")
+    c.add("tiles", str(tmp_path / "tile_*.cdf"))
+    ds = c.open("tiles")
+    assert ds.eastward_wind.chunks[:3] == ((3, 3), (5,), (3, 2))
+    xr.testing.assert_identical(ds.load(), X)
@@ -1,4 +1,8 @@
+import sys
+
+import numpy as np
 import pytest
+import xarray as xr
 
 from windeval.io import products
 
@@ -8,11 +12,225 @@ def test_open_product():
         products.open_product("path1", "path2", kwarg={"kwarg": "kwargs"})
 
 
-def test_info(X):
-    with pytest.raises(NotImplementedError):
-        products.info({"ds": X})
+def test_open_product_chunks(X, tmp_path):
+    dask = pytest.importorskip("dask")
+    X.to_netcdf(tmp_path / "a.cdf")
+    X.to_netcdf(tmp_path / "b.cdf")
+    ds = products.open_product(
+        str(tmp_path / "a.cdf"),
+        str(tmp_path / "b.cdf"),
+        experimental=True,
+        chunks={"time": 2},
+    )
+    assert list(ds.keys()) == ["a", "b"]
+    assert isinstance(ds["a"].eastward_wind.data, dask.array.Array)
+    assert ds["b"].eastward_wind.chunks[0] == (2, 2, 2)
+    xr.testing.assert_identical(ds["a"].load(), X)
+
+
+def test_open_product_files(X, tmp_path):
+    pytest.importorskip("dask")
+    for d in ["era", "ncep"]:
+        (tmp_path / d).mkdir()
+        for t in range(0, 6, 2):
+            X.isel(time=slice(t, t + 2)).to_netcdf(tmp_path / d / f"day_{t}.cdf")
+    files = sorted(str(p) for p in (tmp_path / "ncep").iterdir())
+    ds = products.open_product(
+        str(tmp_path / "era" / "day_*.cdf"), files[::-1], experimental=True
+    )
+    assert list(ds.keys()) == ["era", "ncep"]
+    for v in ds.values():
+        assert v.eastward_wind.chunks[0] == (2, 2, 2)
+        xr.testing.assert_identical(v.load(), X)
+    ds = products.open_product(
+        files[:1], str(tmp_path / "e*" / "day_*.cdf"), "a", "b", experimental=True
+    )
+    assert list(ds.keys()) == ["a", "b"]
+    assert ds["a"].sizes["time"] == 2
+    assert products._name(files[:1]) == "day_0"
+    assert products._name(str(tmp_path / "e*" / "day_*.cdf")) == tmp_path.name
+    with pytest.raises(FileNotFoundError):
+        products.open_product(
+            str(tmp_path / "none_*.cdf"), files, experimental=True
+        )
+
 
+def test_open_product_names(X, tmp_path):
+    pytest.importorskip("dask")
+    for name in ["era", "ncep"]:
+        for t in range(0, 6, 2):
+            X.isel(time=slice(t, t + 2)).to_netcdf(tmp_path / f"{name}_{t}.cdf")
+    ds = products.open_product(
+        str(tmp_path / "era_*.cdf"), str(tmp_path / "ncep_*.cdf"), experimental=True
+    )
+    assert list(ds) == ["era", "ncep"]
+    xr.testing.assert_identical(ds["ncep"].load(), X)
+    files = sorted(str(p) for p in tmp_path.iterdir())
+    ds = products.open_product(files[:3], files[3:], experimental=True)
+    assert list(ds) == ["era", "ncep"]
+    with pytest.raises(ValueError):
+        products.open_product(files[:2], files[:3], experimental=True)
+    with pytest.raises(ValueError):
+        products.open_product(files[:1], files[3:], "a", "a", experimental=True)
 
-def test_select(X):
+
+def test_save_product(X, tmp_path):
+    products.save_product({"a": X, "b": X}, str(tmp_path), experimental=True)
+    products.save_product({"c": X}, str(tmp_path), experimental=True, n_workers=2)
+    for k in "abc":
+        xr.testing.assert_identical(xr.load_dataset(tmp_path / (k + ".cdf")), X)
     with pytest.raises(NotImplementedError):
-        products.select({"ds": X})
+        products.save_product({"a": X}, str(tmp_path))
+    with pytest.raises(ValueError):
+        products.save_product({"a": X}, str(tmp_path), experimental=True, target="h5")
+
+
+def test_save_product_encoding(X, tmp_path):
+    products.save_product(
+        {"a": X},
+        str(tmp_path),
+        experimental=True,
+        complevel=4,
+        dtype="float32",
+        chunks="map",
+    )
+    with xr.open_dataset(tmp_path / "a.cdf") as ds:
+        encoding = ds.eastward_wind.encoding
+        assert encoding["zlib"] and encoding["complevel"] == 4
+        assert encoding["chunksizes"] == (1, 5, 5, 4)
+        assert encoding["dtype"] == "float32"
+        xr.testing.assert_allclose(ds.load(), X)
+    assert products._chunk_sizes(X, "series") == {
+        "time": 6,
+        "depth": 5,
+        "latitude": 5,
+        "longitude": 4,
+    }
+    assert products._chunk_sizes(X, {"time": 100})["time"] == 6
+    Y = X.rename(time="t").assign_coords(
+        t=np.arange(6).astype("datetime64[D]"), depth=np.arange(5)
+    )
+    assert products._chunk_sizes(Y, "map")["t"] == 1
+    assert products._chunk_sizes(Y, "map", "depth") == {
+        "t": 6,
+        "depth": 1,
+        "latitude": 5,
+        "longitude": 4,
+    }
+    with pytest.raises(ValueError):
+        products._chunk_sizes(X.isel(time=0), "series")
+
+
+def test_save_product_zarr(X, tmp_path):
+    pytest.importorskip("zarr")
+    products.save_product(
+        {"a": X}, str(tmp_path), experimental=True, target="zarr", chunks="map"
+    )
+    with xr.open_zarr(tmp_path / "a.zarr") as ds:
+        assert ds.eastward_wind.encoding["chunks"] == (1, 5, 5, 4)
+        xr.testing.assert_identical(ds.load(), X)
+
+
+@pytest.mark.parametrize("target", ["netcdf", "zarr"])
+def test_save_product_append(X, tmp_path, target):
+    if target == "zarr":
+        pytest.importorskip("zarr")
+    for i in range(0, 6, 2):
+        products.save_product(
+            {"a": X.isel(time=slice(i, i + 2))},
+            str(tmp_path),
+            experimental=True,
+            target=target,
+            append_dim="time",
+        )
+    file = tmp_path / ("a.zarr" if target == "zarr" else "a.cdf")
+    with xr.open_dataset(file, engine="zarr" if target == "zarr" else None) as ds:
+        xr.testing.assert_identical(ds.load(), X)
+
+
+def test_save_product_append_errors(X, tmp_path, monkeypatch):
+    kwargs = dict(experimental=True, append_dim="time")
+    products.save_product({"a": X.isel(time=[0])}, str(tmp_path), **kwargs)
+    Y = X.isel(time=[1]).assign(spam=X.eastward_wind.isel(time=[1]))
+    with pytest.raises(ValueError, match="spam"):
+        products.save_product({"a": Y}, str(tmp_path), **kwargs)
+    X.isel(time=[0]).to_netcdf(tmp_path / "b.cdf")
+    with pytest.raises(ValueError, match="unlimited"):
+        products.save_product({"b": X.isel(time=[1])}, str(tmp_path), **kwargs)
+    with xr.open_dataset(tmp_path / "b.cdf") as ds:
+        assert ds.sizes["time"] == 1
+    monkeypatch.setitem(sys.modules, "netCDF4", None)
+    with pytest.raises(ImportError, match=r"windeval\[netcdf\]"):
+        products.save_product({"a": X.isel(time=[1])}, str(tmp_path), **kwargs)
+
+
+def test_info(X):
+    i = products.info({"ds": X})["ds"]
+    assert i["variables"]["eastward_wind"]["dims"] == X.eastward_wind.dims
+    assert i["variables"]["air_density"]["chunksizes"] is None
+    assert i["coordinates"]["time"] == {"size": 6, "min": 0, "max": 5}
+    with pytest.raises(ValueError):
+        products.info("ds")
+
+
+def test_select(X, tmp_path):
+    X = X.assign_coords(longitude=[0, 90, 180, 270], latitude=[-20, -10, 0, 10, 20])
+    X.to_netcdf(tmp_path / "a.cdf")
+    X.to_netcdf(tmp_path / "b.cdf")
+    ds = products.select(
+        products.open_product(
+            str(tmp_path / "a.cdf"),
+            str(tmp_path / "b.cdf"),
+            experimental=True,
+            chunks={"time": 2},
+        ),
+        "eastward_wind",
+        bbox=(80, -10, 190, 10),
+        time=(1, 3),
+        depth=0,
+    )["a"]
+    assert ds.eastward_wind.chunks is not None
+    assert list(ds.data_vars) == ["eastward_wind"]
+    xr.testing.assert_identical(
+        ds.load(),
+        X[["eastward_wind"]].sel(
+            time=slice(1, 3), depth=0, latitude=slice(-10, 10), longitude=[90, 180]
+        ),
+    )
+    xr.testing.assert_identical(products.select({"a": X})["a"], X)
+
+
+def test_select_bbox(X):
+    X = X.assign_coords(longitude=[0, 90, 180, 270], latitude=[-20, -10, 0, 10, 20])
+    ds = products.select({"a": X}, bbox=(260, -90, 100, 90))["a"]
+    assert ds.longitude.values.tolist() == [270, 0, 90]
+    ds = products.select({"a": X}, bbox=(-100, -90, -80, 90))["a"]
+    assert ds.longitude.values.tolist() == [270]
+    ds = products.select({"a": X}, bbox=(-180, 5, 180, 90))["a"]
+    assert ds.sizes["longitude"] == 4
+    assert ds.latitude.values.tolist() == [10, 20]
+    assert products.select({"a": X}, bbox=(0, 30, 10, 40))["a"].sizes["latitude"] == 0
+
+
+def test_select_stations(X):
+    X = X.assign_coords(longitude=[0, 90, 180, 270], latitude=[-20, -10, 0, 10, 20])
+    rng = np.random.default_rng(0)
+    lon, lat = rng.uniform(-180, 180, 50), rng.uniform(-30, 30, 50)
+    ds = products.select({"a": X}, stations=np.stack([lon, lat], axis=-1))["a"]
+    assert ds.eastward_wind.dims == ("time", "depth", "station")
+    grid_lat, grid_lon = np.meshgrid(X.latitude, X.longitude, indexing="ij")
+    i = np.argmax(
+        np.sin(np.deg2rad(lat))[:, None] * np.sin(np.deg2rad(grid_lat.ravel()))
+        + np.cos(np.deg2rad(lat))[:, None]
+        * np.cos(np.deg2rad(grid_lat.ravel()))
+        * np.cos(np.deg2rad(lon[:, None] - grid_lon.ravel())),
+        axis=1,
+    )
+    np.testing.assert_array_equal(ds.latitude, grid_lat.ravel()[i])
+    np.testing.assert_array_equal(ds.longitude, grid_lon.ravel()[i])
+    np.testing.assert_array_equal(ds.station_longitude, lon)
+    assert ds.station_distance.max() < 6371e3 * np.deg2rad(50)
+    ds = products.select({"a": X}, stations={"x": (-85, 9), "y": (1, -19)})["a"]
+    assert ds.station.values.tolist() == ["x", "y"]
+    assert ds.longitude.values.tolist() == [270, 0]
+    assert ds.latitude.values.tolist() == [10, -20]
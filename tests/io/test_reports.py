@@ -1,8 +1,61 @@
-import pytest
-
+from windeval.instrumentation import instrument
 from windeval.io import reports
 
 
-def test_report(X):
-    with pytest.raises(NotImplementedError):
-        reports.report({"ds": X})
+def test_report(X, tmp_path):
+    wnd = {"a": X, "b": X * 2}
+    with instrument() as records:
+        index = reports.report(wnd, tmp_path, nperseg=4)
+    assert index == tmp_path / "index.html"
+    text = index.read_text()
+    assert "<h2>a: eastward_wind</h2>" in text
+    assert "<h2>eastward_wind: comparison</h2>" in text
+    figures = sorted(p.name for p in (tmp_path / "figures").iterdir())
+    a = reports._section_id("a", "eastward_wind")
+    assert f"{a}.png" in figures
+    b = reports._section_id("b", "air_density")
+    assert f"{b}-welch-power_spectral_density.png" in figures
+    assert len(figures) == 12
+    sections = [r["section"] for r in records if r["stage"] == "io.report_section"]
+    assert len(sections) == 6
+
+    # only the sections of the changed product are generated again
+    mtime = (tmp_path / "figures" / f"{a}.png").stat().st_mtime_ns
+    wnd["b"] = wnd["b"].assign(eastward_wind=X.eastward_wind * 3)
+    with instrument() as records:
+        reports.report(wnd, tmp_path, nperseg=4)
+    sections = [r["section"] for r in records if r["stage"] == "io.report_section"]
+    assert sections == [reports._section_id("b", "eastward_wind")]
+    compared = [r["variable"] for r in records if r["stage"] == "io.report_compare"]
+    assert compared == ["eastward_wind"]
+    assert (tmp_path / "figures" / f"{a}.png").stat().st_mtime_ns == mtime
+    assert index.read_text() != text
+
+    # changed parameters regenerate everything, removed sections are cleaned up
+    with instrument() as records:
+        reports.report(
+            {"a": X}, tmp_path, variables=["eastward_wind"], nperseg=2, n_workers=2
+        )
+    assert len(list((tmp_path / "figures").iterdir())) == 2
+    assert "comparison" not in index.read_text()
+    with instrument() as records:
+        reports.report({"a": X}, tmp_path, variables=["eastward_wind"], nperseg=2)
+    changed = [r["changed"] for r in records if r["stage"] == "io.report_sections"]
+    assert changed == [0]
+
+
+def test_section_id(X, tmp_path):
+    ids = [
+        reports._section_id("a b", "u"),
+        reports._section_id("a_b", "u"),
+        reports._section_id("a-b", "u"),
+        reports._section_id("compare", "u"),
+        reports._section_id("u", compare=True),
+    ]
+    assert len(set(ids)) == len(ids)
+    assert ids[0].startswith("a_b-u-")
+
+    wnd = {"a b": X, "a_b": X * 2, "compare": X * 3}
+    index = reports.report(wnd, tmp_path, variables=["eastward_wind"], nperseg=4)
+    assert index.read_text().count("<section") == 4
+    assert len(list((tmp_path / "figures").iterdir())) == 6
@@ -0,0 +1,56 @@
+import os
+
+import numpy as np
+import pytest
+import xarray as xr
+
+from windeval import _cache
+
+
+def test_cache(X, tmp_path):
+    cache = _cache.Cache(tmp_path)
+    assert cache.get("a") is None
+    cache.put("a", X.eastward_wind)
+    cache.max_bytes = 2 * os.path.getsize(tmp_path / "a.nc") + 1024
+    xr.testing.assert_identical(cache.get("a"), X.eastward_wind)
+    cache.put("b", X.northward_wind)
+    os.utime(tmp_path / "a.nc", ns=(0, 0))
+    os.utime(tmp_path / "b.nc", ns=(1, 1))
+    cache.get("a")
+    cache.put("c", X.air_density)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.nc", "c.nc"]
+    assert cache.stats == {
+        "hits": 2,
+        "misses": 1,
+        "evictions": 1,
+        "entries": 2,
+        "bytes": os.path.getsize(tmp_path / "a.nc")
+        + os.path.getsize(tmp_path / "c.nc"),
+    }
+    cache.clear()
+    assert cache.stats["entries"] == 0
+    assert cache.key("a", "b") != cache.key("ab")
+
+
+def test_cache_put_dask(X, tmp_path):
+    pytest.importorskip("dask")
+    da = X.eastward_wind.chunk({"time": 2})
+    cache = _cache.Cache(tmp_path, max_bytes=da.nbytes - 1)
+    assert cache.put("a", da).chunks is not None
+    assert cache.stats["entries"] == 0
+    cache.max_bytes = 2 ** 20
+    y = cache.put("a", da)
+    assert y.chunks is None
+    xr.testing.assert_identical(cache.get("a"), y)
+
+
+def test_fingerprint(X):
+    f = _cache.fingerprint(X.eastward_wind)
+    assert f == _cache.fingerprint(X.copy(deep=True).eastward_wind)
+    assert f != _cache.fingerprint(X.eastward_wind + 1)
+    assert f != _cache.fingerprint(X.eastward_wind.assign_coords(time=np.arange(6) + 1))
+    dask = pytest.importorskip("dask")  # noqa: F841
+    Y = X.chunk({"time": 2})
+    assert _cache.fingerprint(Y.eastward_wind) == _cache.fingerprint(
+        X.chunk({"time": 2}).eastward_wind
+    )
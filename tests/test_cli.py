@@ -0,0 +1,91 @@
+import pytest
+import xarray as xr
+
+from windeval import cli, processing
+from windeval.io import products
+from windeval.instrumentation import instrument
+
+
+VARIABLES = ["surface_downward_eastward_stress", "sverdrup_transport"]
+
+
+@pytest.fixture
+def files(X, tmp_path):
+    paths = []
+    for i, t in enumerate([slice(0, 4), slice(4, None)]):
+        paths.append(str(tmp_path.joinpath(f"product_{i}.nc")))
+        X.isel(time=t).to_netcdf(paths[-1])
+    return paths
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        ["--block-size", "4"],
+        ["--block-size", "1", "--workers", "2"],
+        ["--target", "zarr", "--drag-coefficient", "large_and_pond_1981"],
+    ],
+)
+def test_main(X, files, tmp_path, options, capsys):
+    output = tmp_path.joinpath("out")
+    args = files + ["-o", str(output), "--vars", ",".join(VARIABLES), "--name", "p"]
+    with instrument() as records:
+        assert cli.main(args + options) == 0
+    kwargs = {}
+    if "--drag-coefficient" in options:
+        kwargs["drag_coefficient"] = "large_and_pond_1981"
+    expected = processing.compute(X.copy(), VARIABLES, **kwargs)[VARIABLES]
+    if "zarr" in options:
+        Y = xr.open_zarr(output.joinpath("p.zarr")).load()
+    else:
+        Y = xr.open_dataset(output.joinpath("p.cdf")).load()
+    xr.testing.assert_allclose(Y, expected)
+    err = capsys.readouterr().err
+    if "--block-size" in options:
+        n = -(-6 // int(options[1]))
+        assert f"block {n}/{n}: 6/6 time steps" in err
+    if "--workers" not in options:
+        blocks = [r for r in records if r["stage"] == "cli.block"]
+        assert len(blocks) == err.count("block ")
+
+
+def test_main_errors(files, tmp_path):
+    args = files + ["-o", str(tmp_path)]
+    with pytest.raises(SystemExit):
+        cli.main(args + ["--vars", "spam"])
+    with pytest.raises(SystemExit):
+        cli.main(args + ["--vars", VARIABLES[0], "--drag-coefficient", "spam"])
+    with pytest.raises(SystemExit):
+        cli.main([str(tmp_path.joinpath("*.cdf")), "-o", str(tmp_path), "--vars", "x"])
+
+
+@pytest.mark.parametrize("target", ["netcdf", "zarr"])
+def test_main_incremental(X, files, tmp_path, target, capsys):
+    output = tmp_path.joinpath("out")
+    args = ["-o", str(output), "--vars", ",".join(VARIABLES), "--name", "p"]
+    args += ["--target", target, "--block-size", "1", "--incremental"]
+    store = output.joinpath("p.zarr" if target == "zarr" else "p.cdf")
+    expected = processing.compute(X.copy(), VARIABLES)[VARIABLES]
+
+    def result():
+        if target == "zarr":
+            return xr.open_zarr(store).load()
+        with xr.open_dataset(store) as ds:
+            return ds.load()
+
+    assert cli.main(files[:1] + args) == 0
+    xr.testing.assert_allclose(result(), expected.isel(time=slice(0, 4)))
+    # an interrupted append leaves steps that are not recorded as complete
+    products._save("p", expected.isel(time=[4]) * 0, str(output), target, "time")
+    with instrument() as records:
+        assert cli.main(files + args) == 0
+    blocks = [r["start"] for r in records if r["stage"] == "cli.block"]
+    assert blocks == [4, 5]
+    xr.testing.assert_allclose(result(), expected)
+    capsys.readouterr()
+
+    with instrument() as records:
+        assert cli.main(files + args) == 0
+    assert not [r for r in records if r["stage"] == "cli.block"]
+    assert "no new time steps" in capsys.readouterr().err
+    xr.testing.assert_allclose(result(), expected)
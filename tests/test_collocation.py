@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+import xarray as xr
+
+from windeval import _spatial
+from windeval.collocation import collocate
+from windeval.io import products
+
+
+@pytest.fixture
+def grid():
+    rng = np.random.default_rng(0)
+    lat, lon = np.arange(-20.0, 21.0, 5.0), np.arange(0.0, 360.0, 10.0)
+    return xr.Dataset(
+        {
+            "eastward_wind": (
+                ("time", "latitude", "longitude"),
+                rng.standard_normal((4, len(lat), len(lon))),
+            ),
+            "northward_wind": (("time", "latitude", "longitude"), np.ones((4, 9, 36))),
+            "air_density": (("time",), np.full(4, 1.2)),
+        },
+        coords={"time": np.arange(4), "latitude": lat, "longitude": lon},
+    )
+
+
+def test_collocate(grid):
+    rng = np.random.default_rng(1)
+    lon, lat = rng.uniform(0, 350, 100), rng.uniform(-20, 20, 100)
+    Y = collocate(grid, np.stack([lon, lat], axis=-1))
+    assert Y.eastward_wind.dims == ("time", "station")
+    expected = grid.eastward_wind.interp(
+        latitude=xr.DataArray(lat, dims="station"),
+        longitude=xr.DataArray(lon, dims="station"),
+    )
+    np.testing.assert_allclose(Y.eastward_wind, expected, rtol=1e-12)
+    np.testing.assert_array_equal(Y.station_latitude, lat)
+    xr.testing.assert_identical(Y.air_density, grid.air_density)
+
+    Y = collocate(grid, {"a": (355.0, 0.0), "b": (-5.0, 0.0), "c": (0.0, 30.0)})
+    assert Y.station.values.tolist() == ["a", "b", "c"]
+    np.testing.assert_allclose(
+        Y.eastward_wind[:, 0],
+        grid.eastward_wind.sel(latitude=0)[:, [0, -1]].mean("longitude"),
+    )
+    np.testing.assert_allclose(Y.eastward_wind[:, 1], Y.eastward_wind[:, 0])
+    assert Y.eastward_wind[:, 2].isnull().all()
+    buoy = xr.Dataset(coords={"latitude": [0.0], "longitude": [355.0]})
+    xr.testing.assert_identical(
+        collocate(grid, {"a": buoy}).eastward_wind, Y.eastward_wind[:, :1]
+    )
+
+
+def test_collocate_nearest(grid):
+    rng = np.random.default_rng(2)
+    points = np.stack([rng.uniform(-180, 180, 50), rng.uniform(-20, 20, 50)], axis=-1)
+    Y = collocate(grid, points, method="nearest")
+    S = products.select({"a": grid}, stations=points)["a"]
+    np.testing.assert_array_equal(Y.eastward_wind, S.eastward_wind)
+    with pytest.raises(ValueError):
+        collocate(grid, points, method="cubic")
+
+
+def test_collocate_missing(grid):
+    grid.eastward_wind[:, 4, 1] = np.nan
+    Y = collocate(grid, [(12.5, 0.0), (10.0, 0.0)])
+    np.testing.assert_allclose(Y.eastward_wind[:, 0], grid.eastward_wind[:, 4, 2])
+    assert Y.eastward_wind[:, 1].isnull().all()
+
+
+def test_collocate_dask(grid):
+    pytest.importorskip("dask")
+    points = [(1.0, 2.0), (300.0, -7.0)]
+    Y = collocate(grid.chunk({"time": 1}), points)
+    assert Y.eastward_wind.chunks == ((1, 1, 1, 1), (2,))
+    xr.testing.assert_allclose(Y.compute(), collocate(grid, points))
+    Y = collocate(grid.astype(np.float32), points)
+    assert Y.eastward_wind.dtype == np.float32
+
+
+def test_collocate_time(grid):
+    points = [(1.0, 2.0)]
+    Y = collocate(grid, points, time=[0.4, 2.6, 9.0])
+    np.testing.assert_array_equal(Y.time, [0.4, 2.6, 9.0])
+    expected = collocate(grid, points).eastward_wind
+    np.testing.assert_array_equal(Y.eastward_wind[:2], expected[[0, 3]])
+    Y = collocate(grid, points, time=[0.4, 2.6, 9.0], tolerance=0.5)
+    np.testing.assert_allclose(Y.eastward_wind[:2], expected[[0, 3]])
+    assert Y.eastward_wind[2].isnull().all()
+    Y = collocate(grid, points, time=[0.5], time_method="linear")
+    np.testing.assert_allclose(Y.eastward_wind[0], expected[:2].mean("time"))
+
+
+def test_interpolation_weights():
+    lat, lon = np.arange(-10.0, 11.0, 10.0), np.arange(0.0, 360.0, 90.0)
+    w = _spatial.interpolation_weights(lat, lon, [5.0, 0.0], [45.0, 315.0])
+    assert w is _spatial.interpolation_weights(lat, lon, [5.0, 0.0], [45.0, 315.0])
+    assert w.shape == (2, 12)
+    np.testing.assert_allclose(w.sum(axis=1), 1)
+    np.testing.assert_allclose(w[1].toarray().reshape(3, 4)[1], [0.5, 0, 0, 0.5])
+    w = _spatial.interpolation_weights(lat, lon[:3], [0.0], [225.0])
+    assert w.nnz == 0
+    with pytest.raises(ValueError):
+        _spatial.interpolation_weights(lat[:, None], lon, [0.0], [0.0])
@@ -0,0 +1,46 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import windeval
+
+
+def _imported(code):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    out = subprocess.run(
+        [sys.executable, "-c", f"import sys\n{code}\nprint(' '.join(sys.modules))"],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=env,
+    )
+    return set(out.stdout.split())
+
+
+@pytest.mark.parametrize(
+    "code, lazy",
+    [
+        ("import windeval", ["xarray", "scipy", "matplotlib", "windeval.processing"]),
+        ("from windeval import processing", ["scipy.signal", "matplotlib"]),
+        ("from windeval import io", ["scipy", "matplotlib"]),
+        ("from windeval import plot", ["scipy", "matplotlib"]),
+    ],
+)
+def test_lazy_imports(code, lazy):
+    assert not set(lazy) & _imported(code)
+
+
+def test_all():
+    from windeval import processing
+    from windeval.io import api
+
+    for name in windeval.__all__:
+        assert getattr(windeval, name) is not None
+        assert name in dir(windeval)
+    assert windeval.diagnostics is processing.diagnostics
+    assert windeval.io.open_product is api.open_product
+    assert windeval.io.Catalog is api.Catalog
+    with pytest.raises(AttributeError):
+        windeval.spam
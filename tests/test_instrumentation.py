@@ -0,0 +1,67 @@
+import json
+import logging
+
+import pytest
+
+from windeval import instrumentation, processing
+from windeval.io import products
+
+
+def test_instrument(X, tmp_path, caplog):
+    received = []
+    logger = logging.getLogger("windeval.test")
+    with caplog.at_level(logging.DEBUG, logger="windeval.test"):
+        with instrumentation.instrument(
+            received.append, tmp_path / "records.jsonl", logger
+        ) as records:
+            processing.sverdrup_transport(X)
+    assert received == records
+    stages = [r["stage"] for r in records]
+    assert stages[-1] == "processing.sverdrup_transport"
+    assert "processing.drag_coefficient" in stages
+    assert "processing.assign" in stages
+    assert records[-1]["depth"] == 0
+    assert records[-1]["shape"] == list(X.sverdrup_transport.shape)
+    assert records[-1]["nbytes"] == X.sverdrup_transport.nbytes
+    assert all(r["wall"] >= 0 and r["cpu"] >= 0 for r in records)
+    assert all(r["depth"] > 0 for r in records[:-1])
+    with open(tmp_path / "records.jsonl") as f:
+        assert [json.loads(line)["stage"] for line in f] == stages
+    assert len(caplog.records) == len(records)
+    assert not instrumentation._SINKS
+    with instrumentation.stage("unused") as r:
+        r["nbytes"] = 1
+        assert r == {}
+
+
+def test_instrument_memory(X):
+    with instrumentation.instrument(memory=True) as records:
+        processing.wind_speed(X)
+    assert records[-1]["stage"] == "processing.wind_speed"
+    assert records[-1]["peak"] >= X.wind_speed.nbytes
+    assert all(r["peak"] <= records[-1]["peak"] for r in records)
+
+
+def test_instrument_error():
+    with instrumentation.instrument() as records:
+        with pytest.raises(ValueError):
+            with instrumentation.stage("failing", size=1):
+                raise ValueError()
+    assert records[0]["error"] == "ValueError"
+    assert records[0]["size"] == 1
+
+
+def test_instrument_io(X, tmp_path):
+    with instrumentation.instrument() as records:
+        products.save_product({"a": X}, str(tmp_path), experimental=True)
+        products.open_product(
+            str(tmp_path / "a.cdf"),
+            str(tmp_path / "a.cdf"),
+            "a",
+            "b",
+            experimental=True,
+        )
+    assert [r["stage"] for r in records] == ["io.save_product"] + 2 * [
+        "io.open_product"
+    ]
+    assert records[0]["nbytes"] == X.nbytes
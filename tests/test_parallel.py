@@ -0,0 +1,59 @@
+import collections
+
+import numpy as np
+import xarray as xr
+
+from windeval import _parallel
+
+
+def _mean(wndkey, ds, var):
+    return wndkey, float(ds[var].mean()), isinstance(ds[var].data.base, np.memmap)
+
+
+def test_share(X, tmp_path):
+    X = X.assign_coords(height=(("latitude", "longitude"), np.ones((5, 4))))
+    shared = _parallel._share(X, str(tmp_path), nbytes=0)
+    assert len(list(tmp_path.iterdir())) == 4
+    assert "eastward_wind" not in shared[0]
+    Y = _parallel._attach(shared)
+    xr.testing.assert_identical(Y, X)
+    assert list(Y.data_vars) == list(X.data_vars)
+    assert isinstance(Y.eastward_wind.data.base, np.memmap)
+    assert not Y.eastward_wind.data.flags.writeable
+
+
+def test_map_products(X, monkeypatch):
+    monkeypatch.setattr(_parallel, "_SHARE_NBYTES", 0)
+    wnddict = {"a": X, "b": X * 2}
+    y = _parallel.map_products(_mean, wnddict, ["b", "a"], "eastward_wind")
+    z = _parallel.map_products(
+        _mean, wnddict, ["b", "a"], "eastward_wind", n_workers=2
+    )
+    assert list(y) == list(z) == ["b", "a"]
+    for k in y:
+        assert y[k][:2] == z[k][:2]
+        assert not y[k][2] and z[k][2]
+
+
+def test_map_products_shared_dir(X, tmp_path, monkeypatch):
+    monkeypatch.setattr(_parallel, "_SHARE_NBYTES", 0)
+    wnddict = {k: X * i for i, k in enumerate("abcde")}
+    y = _parallel.map_products(
+        _mean, wnddict, wnddict, "eastward_wind", n_workers=1, shared_dir=tmp_path
+    )
+    assert list(y) == list(wnddict)
+    assert all(v[2] for v in y.values())
+    assert not list(tmp_path.iterdir())
+
+
+def test_shared_dir(X, monkeypatch):
+    usage = collections.namedtuple("usage", "total used free")
+    nbytes = X.eastward_wind.nbytes
+    monkeypatch.setattr(_parallel, "_SHARED_DIR", "/dev/shm")
+    monkeypatch.setattr(
+        _parallel.shutil, "disk_usage", lambda p: usage(0, 0, 64 * nbytes)
+    )
+    assert _parallel._shared_dir(X, nbytes=0) == "/dev/shm"
+    assert _parallel._shared_dir(X.expand_dims(n=64), nbytes=0) is None
+    monkeypatch.setattr(_parallel, "_SHARED_DIR", None)
+    assert _parallel._shared_dir(X, nbytes=0) is None
@@ -1,3 +1,5 @@
+import matplotlib.pyplot as plt
+import numpy as np
 import pytest
 
 from windeval import plotting, processing
@@ -11,3 +13,62 @@ def test_plot(X):
         plotting.plot({"ds": X}, "eastward_wind", dataset=[])
     ds = processing.diagnostics({"ds": X}, "eastward_wind", "welch")
     plotting.plot(ds, "power_spectral_density")
+
+
+def test_plot_n_workers(X):
+    n = len(plt.get_fignums())
+    plotting.plot({"a": X, "b": X}, "eastward_wind", n_workers=2)
+    assert len(plt.get_fignums()) == n + 2
+    ds = processing.diagnostics({"a": X}, "eastward_wind", "welch")
+    with pytest.raises(ValueError):
+        plotting.plot(ds, "power_spectral_density", n_workers=2)
+
+
+def test_decimation():
+    x = np.arange(10000)
+    y = np.sin(x / 100.0)
+    y[1234], y[5678] = 5, -5
+    xd, yd = plotting._minmax(x, y, 100)
+    assert len(xd) <= 200
+    assert np.all(np.diff(xd) > 0)
+    assert yd.max() == 5 and yd.min() == -5
+    y[:200] = np.nan
+    assert not np.isnan(plotting._minmax(x, y, 100)[1]).any()
+    xd, yd = plotting._lttb(x, y, 100)
+    assert len(xd) == 100
+    assert xd[0] == 0 and xd[-1] == 9999
+    assert 1234 in xd and 5678 in xd
+    t = np.arange("2000-01-01", "2000-02-01", dtype="datetime64[h]")
+    assert plotting._lttb(t, np.ones(len(t)), 50)[0].dtype == t.dtype
+    xd, yd = plotting._lttb(x[:10], y[:10], 100)
+    assert len(xd) == 10
+
+
+def test_render(X, tmp_path):
+    n = len(plt.get_fignums())
+    ds = processing.diagnostics(
+        {"ds": X}, "eastward_wind", "welch", dim="time", nperseg=4
+    )
+    images = plotting.render(ds, ["eastward_wind", "power_spectral_density"])
+    assert list(images) == [
+        ("ds", "eastward_wind"),
+        ("ds", "power_spectral_density"),
+    ]
+    assert all(i.startswith(b"\x89PNG") for i in images.values())
+    assert len(plt.get_fignums()) == n
+    series = plotting._drawable(X.eastward_wind.isel(latitude=0, longitude=0))
+    assert series[0].dims == ("time",)
+    assert series[1] == ["depth = 0"]
+    assert plotting._coarsen(X.eastward_wind, {"latitude": 2, "longitude": 4}).sizes[
+        "latitude"
+    ] == 1
+    paths = plotting.render(
+        {"a": X, "b": X}, "eastward_wind", tmp_path, method="lttb", n_workers=2
+    )
+    assert paths["b", "eastward_wind"] == tmp_path / "b_eastward_wind.png"
+    assert paths["b", "eastward_wind"].read_bytes().startswith(b"\x89PNG")
+    paths = plotting.plot({"c": X}, "northward_wind", output=tmp_path)
+    assert paths == {("c", "northward_wind"): tmp_path / "c_northward_wind.png"}
+    assert (tmp_path / "c_northward_wind.png").exists()
+    with pytest.raises(ValueError):
+        plotting.render({"a": X}, "eastward_wind", method="every")
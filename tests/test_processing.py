@@ -5,6 +5,8 @@ import numpy as np
 import pytest
 import xarray as xr
 
+from scipy import signal
+
 from windeval import processing
 
 
@@ -106,6 +108,90 @@ def test_BulkFormula_K00(accuracy):
     assert tau.shape == X.w.shape
 
 
+@pytest.mark.parametrize(
+    "drag_coefficient, extend_ranges",
+    [
+        ("ncep_ncar_2007", None),
+        ("large_and_pond_1981", False),
+        ("large_and_pond_1981", True),
+        ("yelland_and_taylor_1996", False),
+        ("yelland_and_taylor_1996", True),
+        ("trenberth_etal_1990", None),
+        ("large_and_yeager_2004", False),
+        ("large_and_yeager_2004", True),
+        ("kara_etal_2000", None),
+    ],
+)
+def test_BulkFormula_fused(drag_coefficient, extend_ranges):
+    x = np.append(np.linspace(-30, 30, 6001), [0, 1, 3, 4, 6, 10, 11, 25, 26, np.nan])
+    X = xr.Dataset(
+        {
+            "w": (("x"), x),
+            "sea_surface_temperature": (("x"), np.full(x.shape, 290)),
+            "air_temperature": (("x"), np.full(x.shape, 289)),
+            "air_density": (("x"), np.linspace(1.1, 1.3, x.size)),
+        }
+    )
+    kwargs = {} if extend_ranges is None else {"extend_ranges": extend_ranges}
+    tau = processing.BulkFormula(drag_coefficient).calculate(X, "w", **kwargs)
+    BFI = processing.BulkFormula(drag_coefficient, fused=True)
+    assert BFI.fused
+    tau_fused = BFI.calculate(X, "w", **kwargs)
+    assert isinstance(tau_fused, xr.DataArray)
+    assert tau_fused.shape == X.w.shape
+    np.testing.assert_array_equal(np.asarray(tau), tau_fused.values)
+
+
+@pytest.mark.parametrize(
+    "drag_coefficient",
+    [
+        "ncep_ncar_2007",
+        "large_and_pond_1981",
+        "yelland_and_taylor_1996",
+        "kara_etal_2000",
+        "trenberth_etal_1990",
+        "large_and_yeager_2004",
+    ],
+)
+def test_BulkFormula_float32(X, drag_coefficient):
+    X["eastward_wind"][0, 0, 0, :3] = [0.0, 1e-30, 12.0]
+    X["sea_surface_temperature"] = X.air_density + 290
+    X["air_temperature"] = X.air_density + 289
+    kwargs = {}
+    if "extend_ranges" in inspect.signature(
+        getattr(processing.BulkFormula(), drag_coefficient)
+    ).parameters:
+        kwargs["extend_ranges"] = True
+    x = processing.BulkFormula(drag_coefficient).calculate(
+        X, "eastward_wind", **kwargs
+    )
+    y = processing.BulkFormula(drag_coefficient, dtype="float32").calculate(
+        X, "eastward_wind", **kwargs
+    )
+    z = processing.BulkFormula(
+        drag_coefficient, dtype=np.float32, fused=True
+    ).calculate(X, "eastward_wind", **kwargs)
+    assert y.dtype == z.dtype == np.float32
+    np.testing.assert_array_equal(y.values, z.values)
+    assert not np.isinf(y.values).any()
+    large = np.abs(X.eastward_wind.values) > 1e-3
+    np.testing.assert_allclose(y.values[large], x.values[large], rtol=5e-7)
+
+
+def test_epsilon():
+    assert processing._epsilon(np.float64) == 1.0e-24
+    epsilon = processing._epsilon(np.float32)
+    assert np.float32(epsilon) ** 2 >= np.finfo(np.float32).tiny
+    assert np.isfinite(np.float32(7.7) / np.float32(epsilon) ** 2)
+
+
+def test_blockwise():
+    a = np.arange(30.0).reshape(5, 6)
+    b = np.arange(6.0)
+    y = processing._blockwise(np.multiply, a, b, blocksize=4)
+    np.testing.assert_array_equal(y, a * b)
+
+
 def test_wind_speed(X):
     processing.wind_speed(X)
     assert X.data_vars["wind_speed"].values[0, 0, 0, 0] == 5.0
@@ -139,6 +225,39 @@ def test_surface_downward_northward_stress(X):
     assert np.isnan(X.data_vars["surface_downward_northward_stress"].values[0, 0, 0, 1])
 
 
+def test_surface_downward_stress(X):
+    Y = X.copy()
+    processing.surface_downward_eastward_stress(Y, "large_and_pond_1981")
+    processing.surface_downward_northward_stress(Y, "large_and_pond_1981")
+    for fused in [False, True]:
+        Z = processing.surface_downward_stress(
+            X.copy(), "large_and_pond_1981", fused=fused
+        )
+        xr.testing.assert_identical(Z, Y)
+
+
+def test_surface_downward_stress_vector(X):
+    processing.surface_downward_stress(X, vector=True, with_wind_speed=True)
+    assert X.wind_speed.values[0, 0, 0, 0] == 5.0
+    for u, tau in [
+        ("eastward_wind", "surface_downward_eastward_stress"),
+        ("northward_wind", "surface_downward_northward_stress"),
+    ]:
+        assert X[tau].values[0, 0, 0, 0] == 1.3e-3 * 5.0 * X[u].values[0, 0, 0, 0]
+        assert np.isnan(X[tau].values[0, 0, 0, 1])
+    Y = processing.surface_downward_stress(
+        X.copy(), "yelland_and_taylor_1996", vector=True, fused=True
+    )
+    Z = processing.surface_downward_stress(
+        X.copy(), "yelland_and_taylor_1996", vector=True
+    )
+    xr.testing.assert_allclose(Y, Z, rtol=1e-15)
+    with pytest.raises(ValueError):
+        processing.surface_downward_stress(
+            X.copy(), bulk_formula="ncep_ncar_2007", vector=True
+        )
+
+
 def test_northward_ekman_transport(X):
     processing.surface_downward_eastward_stress(
         X, drag_coefficient="ncep_ncar_2007", bulk_formula="generic"
@@ -180,10 +299,214 @@ def test_eastward_ekman_transport_v2(X):
 
 def test_sverdrup_transport(X):
     processing.sverdrup_transport(X)
+    tau_x = X.surface_downward_eastward_stress.values[0, 0]
+    tau_y = X.surface_downward_northward_stress.values[0, 0]
+    radius = processing._GridGeometry.radius
+    dx = dy = radius * np.pi / 180
+    beta = processing._Coriolis().derivative(0.0) / radius
+    curl = (tau_y[1, 1] - tau_y[1, 0]) / (dx * np.cos(np.pi / 180)) - (
+        tau_x[2, 0] - tau_x[1, 0]
+    ) / dy
     assert math.isclose(
-        X.sverdrup_transport[0, 0, 0, 0].values, -62.40566775, rel_tol=1e-7
+        X.sverdrup_transport[0, 0, 1, 0].values,
+        curl / (beta * np.cos(np.pi / 180)),
+        rel_tol=1e-12,
     )
     assert np.isnan(X.data_vars["sverdrup_transport"].values[0, 0, 0, 1])
+    assert np.isnan(X.data_vars["sverdrup_transport"].values[0, 0, -1, 0])
+
+
+def test_sverdrup_transport_analytic():
+    # stresses linear in the distances along the sphere have a constant curl
+    lat = np.linspace(-60.0, 60.0, 25)
+    lon = np.linspace(0.0, 10.0, 11)
+    radius = processing._GridGeometry.radius
+    y = radius * np.deg2rad(lat)[:, np.newaxis]
+    x = radius * np.cos(np.deg2rad(lat))[:, np.newaxis] * np.deg2rad(lon)
+    a, b = 2e-7, -3e-7
+    grid = ("latitude", "longitude")
+    X = xr.Dataset(
+        {
+            "surface_downward_eastward_stress": (grid, np.broadcast_to(a * y, x.shape)),
+            "surface_downward_northward_stress": (grid, b * x),
+        },
+        coords={"latitude": lat, "longitude": lon},
+    )
+    V = processing.sverdrup_transport(X).sverdrup_transport.values
+    # angular velocity of the Earth in 1/s
+    beta = 2 * 7.292115e-5 * np.cos(np.deg2rad(lat[:-1])) / radius
+    expected = np.broadcast_to((b - a) / beta[:, np.newaxis], V[:-1, :-1].shape)
+    np.testing.assert_allclose(V[:-1, :-1], expected, rtol=1e-7)
+
+
+def test_sverdrup_transport_leading_dims(X):
+    processing.sverdrup_transport(X)
+    for Y in [X.isel(depth=0), X.isel(time=0, depth=0)]:
+        Y = processing.sverdrup_transport(Y.drop_vars("sverdrup_transport"))
+        assert Y.sverdrup_transport.dims == Y.eastward_wind.dims
+        np.testing.assert_array_equal(
+            Y.sverdrup_transport.values,
+            X.sverdrup_transport.sel(Y.sverdrup_transport.coords).values,
+        )
+
+
+@pytest.mark.parametrize(
+    "tile, n_workers, chunks",
+    [
+        ((1, 1), None, None),
+        ((4, 5), None, None),
+        ((13, 3), 2, None),
+        (None, None, {"latitude": 4, "longitude": 5}),
+        ((6, 7), None, {"time": 1, "latitude": 4}),
+    ],
+)
+def test_sverdrup_transport_tiled(tile, n_workers, chunks):
+    rng = np.random.default_rng(0)
+    dims = ("time", "latitude", "longitude")
+    X = xr.Dataset(
+        {
+            "surface_downward_eastward_stress": (dims, rng.normal(size=(3, 13, 17))),
+            "surface_downward_northward_stress": (dims, rng.normal(size=(3, 13, 17))),
+        },
+        coords={
+            "latitude": np.linspace(-60, 60, 13),
+            "longitude": np.linspace(0, 340, 17),
+        },
+    )
+    expected = processing.sverdrup_transport(X.copy()).sverdrup_transport
+    if chunks is not None:
+        X = X.chunk(chunks)
+    Y = processing.sverdrup_transport(X, tile=tile, n_workers=n_workers)
+    if chunks is not None:
+        assert Y.sverdrup_transport.chunks[1:] == (
+            X.surface_downward_eastward_stress.chunks[1:]
+            if tile is None
+            else ((6, 6, 1), (7, 7, 3))
+        )
+    np.testing.assert_array_equal(Y.sverdrup_transport.values, expected.values)
+
+
+def test_grid_geometry(X):
+    g = processing._grid_geometry(X)
+    assert processing._grid_geometry(X.isel(time=0)) is g
+    assert processing._grid_geometry(X.isel(latitude=slice(1, None))) is not g
+    np.testing.assert_array_equal(
+        g.coriolis_parameter.values, processing._Coriolis().parameter(X.latitude)
+    )
+    assert g.dx.shape == (5, 3) and g.dy.shape == (4,)
+    assert math.isclose(g.dy[0], g.radius * np.pi / 180)
+    assert math.isclose(g.dx[1, 0], g.dy[0] * np.cos(np.pi / 180))
+    # beta in 1/(m s) at the equator
+    assert math.isclose(g.beta[0], 2.289e-11, rel_tol=1e-3)
+    np.testing.assert_allclose(g.beta, g.beta[0] * np.cos(np.deg2rad(X.latitude)))
+    Y = xr.Dataset(
+        coords={
+            "latitude": np.linspace(-89.5, 89.5, 180),
+            "longitude": np.linspace(0.5, 359.5, 360),
+        }
+    )
+    area = processing._grid_geometry(Y).area
+    assert area.shape == (180, 360)
+    assert math.isclose(area.sum(), 4 * np.pi * g.radius ** 2)
+
+
+def test_compute(X):
+    targets = [
+        "sverdrup_transport",
+        "northward_ekman_transport",
+        "eastward_ekman_transport",
+        "wind_speed",
+    ]
+    Y = processing.compute(
+        X.copy(), targets, drag_coefficient="large_and_pond_1981", n_workers=2
+    )
+    assert set(Y.data_vars) == set(X.data_vars) | set(targets)
+    Z = X.copy()
+    processing.surface_downward_eastward_stress(Z, "large_and_pond_1981")
+    processing.surface_downward_northward_stress(Z, "large_and_pond_1981")
+    for t in targets:
+        processing.DERIVED_VARIABLES[t][0](Z)
+        xr.testing.assert_identical(Y[t], Z[t])
+
+
+def test_compute_float32(X):
+    targets = [
+        "sverdrup_transport",
+        "northward_ekman_transport",
+        "eastward_ekman_transport",
+    ]
+    Y = processing.compute(X.copy(), targets)
+    Z = processing.compute(X.copy(), targets, dtype="float32")
+    for t in targets:
+        assert Z[t].dtype == np.float32
+        y, z = Y[t].values, Z[t].values
+        finite = np.isfinite(y)
+        np.testing.assert_array_equal(np.isfinite(z), finite)
+        scale = np.abs(y[finite]).max()
+        np.testing.assert_allclose(z[finite], y[finite], rtol=0, atol=2.5e-7 * scale)
+    Z = processing.surface_downward_stress(X.copy(), vector=True, dtype="float32")
+    assert Z.surface_downward_northward_stress.dtype == np.float32
+
+
+def test_compute_cache(X, tmp_path):
+    targets = ["sverdrup_transport", "wind_speed"]
+    cache = processing.Cache(tmp_path)
+    Y = processing.compute(X.copy(), targets, cache=cache)
+    assert cache.stats["misses"] == 4 and cache.stats["entries"] == 4
+    Z = processing.compute(X.copy(), targets, cache=cache)
+    assert cache.stats["hits"] == 2 and cache.stats["misses"] == 4
+    for t in targets:
+        xr.testing.assert_identical(Y[t], Z[t])
+    processing.compute(X.copy(), ["northward_ekman_transport"], cache=cache)
+    assert cache.stats["hits"] == 3 and cache.stats["misses"] == 5
+    processing.compute(X.copy(), targets, "large_and_pond_1981", cache=cache)
+    assert cache.stats["hits"] == 4 and cache.stats["misses"] == 8
+    Y = X.copy()
+    Y["northward_wind"] = Y.northward_wind * 2
+    processing.compute(Y, ["sverdrup_transport"], cache=cache)
+    assert cache.stats["hits"] == 5 and cache.stats["misses"] == 10
+
+
+def test_compute_plan(X):
+    processing.surface_downward_eastward_stress(X)
+    assert processing._plan(X, ["sverdrup_transport"]) == {
+        "sverdrup_transport": {"surface_downward_northward_stress"},
+        "surface_downward_northward_stress": set(),
+    }
+    with pytest.raises(ValueError):
+        processing.compute(X, ["unknown"])
+    with pytest.raises(ValueError):
+        processing.compute(X.drop_vars("air_density"), ["sverdrup_transport"])
+    with pytest.raises(ValueError, match="sea_surface_temperature"):
+        processing.compute(
+            X, ["sverdrup_transport"], drag_coefficient="kara_etal_2000"
+        )
+
+
+def test_chunked_pipeline(X):
+    dask = pytest.importorskip("dask")
+    Y = X.chunk({"time": 2})
+    for f in [
+        processing.wind_speed,
+        processing.northward_ekman_transport,
+        processing.eastward_ekman_transport,
+        processing.sverdrup_transport,
+    ]:
+        f(X)
+        f(Y)
+    for v in X.data_vars:
+        assert isinstance(Y[v].data, dask.array.Array)
+        np.testing.assert_array_equal(Y[v].values, X[v].values)
+    ds = processing.diagnostics(Y.chunk({"time": -1}), "eastward_wind", "welch")
+    assert isinstance(ds.power_spectral_density.data, dask.array.Array)
+    np.testing.assert_allclose(
+        ds.power_spectral_density.values,
+        processing.Diagnostics.welch(X.eastward_wind).power_spectral_density.values,
+    )
+    with pytest.raises(ValueError):
+        processing.diagnostics(Y, "eastward_wind", "welch")
+    with pytest.raises(ValueError):
+        processing.diagnostics(X, "eastward_wind", "welch", dim="time", axis=0)
 
 
 def test_conversions(X):
@@ -194,3 +517,164 @@ def test_conversions(X):
 def test_diagnostics(X):
     ds = processing.diagnostics({"ds": X}, "eastward_wind", "welch")
     assert isinstance(ds["ds"]["power_spectral_density"], xr.DataArray)
+
+
+def test_diagnostics_welch_dim(X):
+    ds = processing.diagnostics(X, "eastward_wind", "welch", dim="time", nperseg=4)
+    psd = ds.power_spectral_density
+    assert psd.dims == ("frequency", "depth", "latitude", "longitude")
+    f, y = signal.welch(X.eastward_wind.values[:, 0, 1, 2], nperseg=4)
+    np.testing.assert_array_equal(ds.frequency.values, f)
+    np.testing.assert_allclose(psd.values[:, 0, 1, 2], y)
+    dask = pytest.importorskip("dask")
+    Y = processing.Diagnostics.welch(
+        X.eastward_wind.chunk({"time": 3, "depth": 1}), dim="time", nperseg=4
+    )
+    assert isinstance(Y.power_spectral_density.data, dask.array.Array)
+    xr.testing.assert_allclose(Y.load(), ds[["power_spectral_density"]])
+
+
+def test_diagnostics_n_workers(X):
+    ds = processing.diagnostics(
+        {"a": X, "b": X * 2}, "eastward_wind", "welch", n_workers=2
+    )
+    assert list(ds) == ["a", "b"]
+    xr.testing.assert_identical(
+        ds["a"], processing.diagnostics(X, "eastward_wind", "welch")
+    )
+
+
+def _metrics(a, b, axis):
+    valid = np.isfinite(a) & np.isfinite(b)
+    a, b = np.where(valid, a, np.nan), np.where(valid, b, np.nan)
+    d = a - b
+    ma = np.nanmean(a, axis=axis, keepdims=True)
+    mb = np.nanmean(b, axis=axis, keepdims=True)
+    return {
+        "bias": np.nanmean(d, axis=axis),
+        "rmse": np.sqrt(np.nanmean(d ** 2, axis=axis)),
+        "mae": np.nanmean(abs(d), axis=axis),
+        "correlation": np.nansum((a - ma) * (b - mb), axis=axis)
+        / np.sqrt(np.nansum((a - ma) ** 2, axis=axis))
+        / np.sqrt(np.nansum((b - mb) ** 2, axis=axis)),
+        "std_ratio": np.nanstd(a, axis=axis) / np.nanstd(b, axis=axis),
+        "n": valid.sum(axis=axis),
+    }
+
+
+@pytest.mark.parametrize("blocksize", [None, 1, 4])
+def test_compare(X, blocksize):
+    rng = np.random.default_rng(0)
+    X = X.copy()
+    X["eastward_wind"] = X.eastward_wind + rng.standard_normal(X.eastward_wind.shape)
+    Y = X.copy()
+    Y["eastward_wind"] = 2 * X.eastward_wind + rng.standard_normal(
+        X.eastward_wind.shape
+    )
+    Y = Y.assign_coords(time=Y.time + 2)
+    Y.eastward_wind[0, 0, 0, 0] = np.nan
+    Z = X.isel(latitude=slice(1, None)) + 100
+    result = processing.compare(
+        {"x": X, "y": Y, "z": Z}, "eastward_wind", blocksize=blocksize
+    )
+    assert list(result) == [("x", "y"), ("x", "z"), ("y", "z")]
+    a = X.eastward_wind.values[2:, :, 1:]
+    b = Y.eastward_wind.values[:4, :, 1:]
+    expected = _metrics(a, b, 0)
+    xy = result["x", "y"]
+    assert xy.bias.dims == ("depth", "latitude", "longitude")
+    assert "time" not in xy.coords
+    np.testing.assert_array_equal(xy.latitude, X.latitude[1:])
+    for k, v in expected.items():
+        np.testing.assert_allclose(xy[k].values, v, rtol=1e-12, err_msg=k)
+    np.testing.assert_allclose(result["x", "z"].bias, -100)
+    np.testing.assert_allclose(result["x", "z"].correlation, 1)
+
+    result = processing.compare(
+        {"x": X, "y": Y, "z": Z}, "eastward_wind", dims=X.eastward_wind.dims
+    )
+    for k, v in _metrics(a, b, None).items():
+        np.testing.assert_allclose(result["x", "y"][k].values, v, rtol=1e-12)
+    assert result["x", "y"].bias.dims == ()
+
+
+def test_compare_dask(X):
+    pytest.importorskip("dask")
+    X = X.copy()
+    X["eastward_wind"] = X.eastward_wind * np.arange(X.eastward_wind.size).reshape(
+        X.eastward_wind.shape
+    )
+    Y = X * 2 + 1
+    expected = processing.compare({"x": X, "y": Y}, "eastward_wind")
+    result = processing.compare(
+        {"x": X.chunk({"time": 2}), "y": Y.chunk({"time": 3})},
+        "eastward_wind",
+        dims=["time", "depth"],
+        blocksize=2,
+    )["x", "y"]
+    assert result.n.dims == ("latitude", "longitude")
+    np.testing.assert_allclose(result.std_ratio, 0.5)
+    np.testing.assert_allclose(result.correlation, 1)
+    np.testing.assert_allclose(result.bias, expected["x", "y"].bias.mean("depth"))
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"nperseg": 16},
+        {"fs": 24, "window": "hamming", "nperseg": 15, "noverlap": 5, "nfft": 32},
+        {"nperseg": 16, "detrend": "linear"},
+    ],
+)
+def test_cross_spectra(kwargs):
+    from windeval.instrumentation import instrument
+
+    rng = np.random.default_rng(0)
+    x = rng.standard_normal((64, 3))
+    coords = {"time": np.arange(64), "station": np.arange(3)}
+    products = {
+        k: xr.Dataset({"wind_speed": (("time", "station"), v)}, coords=coords)
+        for k, v in [
+            ("a", x),
+            ("b", 2 * np.roll(x, 1, axis=0) + rng.standard_normal(x.shape)),
+            ("c", rng.standard_normal(x.shape)),
+        ]
+    }
+    with instrument() as records:
+        result = processing.cross_spectra(products, "wind_speed", **kwargs)
+    # one set of segment FFTs per product, not per pair
+    assert [r["stage"] for r in records].count("processing.segment_fft") == 3
+    assert list(result) == [("a", "b"), ("a", "c"), ("b", "c")]
+    for (i, j), ds in result.items():
+        assert ds.coherence.dims == ("frequency", "station")
+        a = products[i].wind_speed.values.T
+        b = products[j].wind_speed.values.T
+        f, csd = signal.csd(a, b, **kwargs)
+        _, coherence = signal.coherence(a, b, **kwargs)
+        _, psd = signal.welch(b, **kwargs)
+        np.testing.assert_allclose(ds.frequency, f)
+        np.testing.assert_allclose(ds.cross_spectral_density, csd.T, atol=1e-12)
+        np.testing.assert_allclose(ds.coherence, coherence.T, atol=1e-12)
+        np.testing.assert_allclose(ds.phase, np.angle(csd.T), atol=1e-12)
+        np.testing.assert_allclose(ds.power_spectral_density_b, psd.T, atol=1e-12)
+
+
+def test_cross_spectra_common_coords(X):
+    X = X.copy()
+    X["eastward_wind"] = X.eastward_wind + np.arange(6).reshape(6, 1, 1, 1) ** 2
+    Y = X.assign_coords(time=X.time + 2)
+    result = processing.cross_spectra(
+        {"x": X, "y": Y}, "eastward_wind", nperseg=4, detrend=False
+    )["x", "y"]
+    assert result.cross_spectral_density.dims == (
+        "frequency",
+        "depth",
+        "latitude",
+        "longitude",
+    )
+    a = X.eastward_wind.values[2:, 0, 1, 1]
+    b = Y.eastward_wind.values[:4, 0, 1, 1]
+    _, csd = signal.csd(a, b, nperseg=4, detrend=False)
+    np.testing.assert_allclose(result.cross_spectral_density[:, 0, 1, 1], csd)
+    with pytest.raises(ValueError):
+        processing.cross_spectra({"x": X, "y": Y}, "eastward_wind", window=np.ones(5))
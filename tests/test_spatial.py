@@ -0,0 +1,20 @@
+import numpy as np
+
+from windeval import _spatial
+
+
+def test_grid_index():
+    lat, lon = np.arange(-80.0, 81.0, 20.0), np.arange(0.0, 360.0, 30.0)
+    index = _spatial.grid_index(lat, lon)
+    assert _spatial.grid_index(lat.copy(), lon.copy()) is index
+    distance, (i, j) = index.query([0.0, 79.0, -1.0], [359.0, 181.0, 14.0])
+    assert i.tolist() == [4, 8, 4]
+    assert j.tolist() == [0, 6, 0]
+    np.testing.assert_allclose(distance[0], 6371e3 * np.deg2rad(1.0))
+    lat2, lon2 = np.meshgrid(lat, lon, indexing="ij")
+    distance2, (i2, j2) = _spatial.GridIndex(lat2, lon2).query(
+        [0.0, 79.0, -1.0], [359.0, 181.0, 14.0]
+    )
+    np.testing.assert_array_equal(i2, i)
+    np.testing.assert_array_equal(j2, j)
+    np.testing.assert_allclose(distance2, distance)
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from windeval import _tiling
+
+
+def _smooth(a, y, x):
+    # centred stencil reaching two grid points, with the coordinates added
+    out = np.full(a.shape, np.nan)
+    out[..., 2:-2, 2:-2] = (
+        a[..., :-4, 2:-2] + a[..., 4:, 2:-2] + a[..., 2:-2, :-4] + a[..., 2:-2, 4:]
+    )
+    return out + y[:, np.newaxis] + x
+
+
+@pytest.mark.parametrize("tile", [(1, 1), (3, 4), (10, 2), (20, 20)])
+@pytest.mark.parametrize("dask", [False, True])
+def test_map_tiles(tile, dask):
+    a = np.random.default_rng(0).normal(size=(2, 10, 11))
+    y, x = np.arange(10.0), np.arange(11.0) * 10
+    expected = _smooth(a, y, x)
+    if dask:
+        import dask.array
+
+        a = dask.array.from_array(a, chunks=(1, 5, 6))
+    b = _tiling.map_tiles(_smooth, [a], (y, x), tile=tile, halo=2, dtype=float)
+    if dask and tile[0] < 10:
+        assert len(b.chunks[1]) > 1
+    np.testing.assert_array_equal(np.asarray(b), expected)